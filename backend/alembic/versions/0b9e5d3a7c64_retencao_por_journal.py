@@ -0,0 +1,29 @@
+"""Política de retenção por journal (journals.retention_days)
+
+Revision ID: 0b9e5d3a7c64
+Revises: f4b6c1d8e2a9
+Create Date: 2026-10-18 19:02:44.183065
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b9e5d3a7c64'
+down_revision: Union[str, Sequence[str], None] = 'f4b6c1d8e2a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('journals', sa.Column('retention_days', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('journals') as batch_op:
+        batch_op.drop_column('retention_days')
@@ -0,0 +1,29 @@
+"""Reserva de refresh por journal (journals.refresh_leased_until)
+
+Revision ID: 2d8e6b4f9a13
+Revises: 7c2f8a4e1d95
+Create Date: 2026-10-18 22:41:09.512384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d8e6b4f9a13'
+down_revision: Union[str, Sequence[str], None] = '7c2f8a4e1d95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('journals', sa.Column('refresh_leased_until', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('journals') as batch_op:
+        batch_op.drop_column('refresh_leased_until')
@@ -0,0 +1,35 @@
+"""Adiciona tabela feed_validators (ETag/Last-Modified por journal)
+
+Revision ID: 3f2a7c9d1e04
+Revises: 9c1535580f6c
+Create Date: 2026-10-18 09:12:40.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f2a7c9d1e04'
+down_revision: Union[str, Sequence[str], None] = '9c1535580f6c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'feed_validators',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('journal_id', sa.Integer(), sa.ForeignKey('journals.id'), primary_key=True),
+        sa.Column('etag', sa.String(), nullable=True),
+        sa.Column('last_modified', sa.String(), nullable=True),
+        sa.Column('checked_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('feed_validators')
@@ -0,0 +1,46 @@
+"""Um job de atualização ativo por usuário (uq_refresh_jobs_active_user)
+
+Revision ID: 4b7f2e9c1a68
+Revises: 8e4a1c6d2b57
+Create Date: 2026-10-19 00:31:47.280953
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7f2e9c1a68'
+down_revision: Union[str, Sequence[str], None] = '8e4a1c6d2b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Duplicatas que já existam ficam só com o job mais recente de cada usuário.
+    op.execute(
+        """
+        UPDATE refresh_jobs
+        SET status = 'error', error = 'Job duplicado', finished_at = CURRENT_TIMESTAMP
+        WHERE status IN ('queued', 'running')
+          AND EXISTS (
+            SELECT 1 FROM refresh_jobs AS newer
+            WHERE newer.user_id = refresh_jobs.user_id
+              AND newer.status IN ('queued', 'running')
+              AND (newer.created_at > refresh_jobs.created_at
+                   OR (newer.created_at = refresh_jobs.created_at AND newer.id > refresh_jobs.id))
+          )
+        """
+    )
+    op.create_index(
+        'uq_refresh_jobs_active_user', 'refresh_jobs', ['user_id'], unique=True,
+        sqlite_where=sa.text("status IN ('queued', 'running')")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_refresh_jobs_active_user', table_name='refresh_jobs')
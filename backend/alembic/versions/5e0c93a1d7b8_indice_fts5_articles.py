@@ -0,0 +1,57 @@
+"""Índice de busca FTS5 sobre título e conteúdo dos artigos
+
+Revision ID: 5e0c93a1d7b8
+Revises: b81d4e6f0a27
+Create Date: 2026-10-18 11:26:54.370182
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e0c93a1d7b8'
+down_revision: Union[str, Sequence[str], None] = 'b81d4e6f0a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+            title, summary,
+            content='articles', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS articles_fts_ai AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS articles_fts_ad AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_fts(articles_fts, rowid, title, summary)
+            VALUES ('delete', old.id, old.title, old.summary);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS articles_fts_au AFTER UPDATE OF title, summary ON articles BEGIN
+            INSERT INTO articles_fts(articles_fts, rowid, title, summary)
+            VALUES ('delete', old.id, old.title, old.summary);
+            INSERT INTO articles_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+        END
+    """)
+    op.execute("INSERT INTO articles_fts(articles_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS articles_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS articles_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS articles_fts_ai")
+    op.execute("DROP TABLE IF EXISTS articles_fts")
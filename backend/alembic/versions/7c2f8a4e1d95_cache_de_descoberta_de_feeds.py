@@ -0,0 +1,37 @@
+"""Cache de descoberta de feeds por site (feed_discoveries)
+
+Revision ID: 7c2f8a4e1d95
+Revises: 0b9e5d3a7c64
+Create Date: 2026-10-18 19:48:12.905317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2f8a4e1d95'
+down_revision: Union[str, Sequence[str], None] = '0b9e5d3a7c64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'feed_discoveries',
+        sa.Column('site_url', sa.String(), primary_key=True),
+        sa.Column('feed_url', sa.String(), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('discovered_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_feed_discoveries_expires_at', 'feed_discoveries', ['expires_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_feed_discoveries_expires_at', table_name='feed_discoveries')
+    op.drop_table('feed_discoveries')
@@ -0,0 +1,29 @@
+"""Heartbeat dos jobs de atualização (refresh_jobs.heartbeat_at)
+
+Revision ID: 8e4a1c6d2b57
+Revises: 2d8e6b4f9a13
+Create Date: 2026-10-18 23:52:31.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4a1c6d2b57'
+down_revision: Union[str, Sequence[str], None] = '2d8e6b4f9a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('refresh_jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('refresh_jobs') as batch_op:
+        batch_op.drop_column('heartbeat_at')
@@ -0,0 +1,54 @@
+"""Agenda de atualização por journal e tabela refresh_jobs
+
+Revision ID: a7d3f5b2c8e1
+Revises: e5a91f3c0b62
+Create Date: 2026-10-18 15:21:09.447216
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3f5b2c8e1'
+down_revision: Union[str, Sequence[str], None] = 'e5a91f3c0b62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('journals', sa.Column('refresh_interval_seconds', sa.Integer(), nullable=True))
+    op.add_column('journals', sa.Column('next_refresh_at', sa.DateTime(), nullable=True))
+    op.add_column('journals', sa.Column('last_refreshed_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_journals_next_refresh_at', 'journals', ['next_refresh_at'])
+
+    op.create_table(
+        'refresh_jobs',
+        sa.Column('id', sa.String(32), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('status', sa.String(16), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('new_articles_found', sa.Integer(), nullable=True),
+        sa.Column('details', sa.JSON(), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+    )
+    op.create_index('ix_refresh_jobs_user_id', 'refresh_jobs', ['user_id'])
+    op.create_index('ix_refresh_jobs_status', 'refresh_jobs', ['status'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_refresh_jobs_status', table_name='refresh_jobs')
+    op.drop_index('ix_refresh_jobs_user_id', table_name='refresh_jobs')
+    op.drop_table('refresh_jobs')
+
+    op.drop_index('ix_journals_next_refresh_at', table_name='journals')
+    with op.batch_alter_table('journals') as batch_op:
+        batch_op.drop_column('last_refreshed_at')
+        batch_op.drop_column('next_refresh_at')
+        batch_op.drop_column('refresh_interval_seconds')
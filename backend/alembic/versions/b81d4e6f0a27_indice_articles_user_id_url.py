@@ -0,0 +1,28 @@
+"""Índice composto (user_id, url) em articles
+
+Revision ID: b81d4e6f0a27
+Revises: 3f2a7c9d1e04
+Create Date: 2026-10-18 10:03:11.502947
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81d4e6f0a27'
+down_revision: Union[str, Sequence[str], None] = '3f2a7c9d1e04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_articles_user_id_url', 'articles', ['user_id', 'url'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_articles_user_id_url', table_name='articles')
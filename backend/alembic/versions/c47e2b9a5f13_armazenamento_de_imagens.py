@@ -0,0 +1,43 @@
+"""Armazenamento de imagens por conteúdo e miniatura dos artigos
+
+Revision ID: c47e2b9a5f13
+Revises: 5e0c93a1d7b8
+Create Date: 2026-10-18 12:40:02.774810
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47e2b9a5f13'
+down_revision: Union[str, Sequence[str], None] = '5e0c93a1d7b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'stored_images',
+        sa.Column('source_url', sa.String(), primary_key=True),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('thumbnail_path', sa.String(), nullable=True),
+        sa.Column('size_bytes', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_stored_images_sha256', 'stored_images', ['sha256'])
+    op.create_index('ix_stored_images_path', 'stored_images', ['path'])
+    op.add_column('articles', sa.Column('thumbnail_url', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('articles') as batch_op:
+        batch_op.drop_column('thumbnail_url')
+    op.drop_index('ix_stored_images_path', table_name='stored_images')
+    op.drop_index('ix_stored_images_sha256', table_name='stored_images')
+    op.drop_table('stored_images')
@@ -0,0 +1,64 @@
+"""Registro de mudanças de artigos (article_changes) para sincronização incremental
+
+Revision ID: d2c84e7a9f30
+Revises: a7d3f5b2c8e1
+Create Date: 2026-10-18 16:02:51.730948
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2c84e7a9f30'
+down_revision: Union[str, Sequence[str], None] = 'a7d3f5b2c8e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'article_changes',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('op', sa.String(16), nullable=False),
+        sa.Column('article_id', sa.Integer(), nullable=True),
+        sa.Column('journal_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('changed_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_article_changes_journal_id', 'article_changes', ['journal_id'])
+
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS article_changes_ai AFTER INSERT ON articles BEGIN
+            INSERT INTO article_changes(op, article_id, journal_id) VALUES ('insert', new.id, new.journal_id);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS article_changes_ad AFTER DELETE ON articles BEGIN
+            INSERT INTO article_changes(op, article_id, journal_id) VALUES ('delete', old.id, old.journal_id);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS article_changes_subscribe AFTER INSERT ON user_journal_association BEGIN
+            INSERT INTO article_changes(op, journal_id, user_id) VALUES ('subscribe', new.journal_id, new.user_id);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS article_changes_unsubscribe AFTER DELETE ON user_journal_association BEGIN
+            INSERT INTO article_changes(op, journal_id, user_id) VALUES ('unsubscribe', old.journal_id, old.user_id);
+        END
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS article_changes_unsubscribe")
+    op.execute("DROP TRIGGER IF EXISTS article_changes_subscribe")
+    op.execute("DROP TRIGGER IF EXISTS article_changes_ad")
+    op.execute("DROP TRIGGER IF EXISTS article_changes_ai")
+    op.drop_index('ix_article_changes_journal_id', table_name='article_changes')
+    op.drop_table('article_changes')
@@ -0,0 +1,130 @@
+"""Artigos compartilhados por journal e estado de leitura por usuário
+
+Revision ID: e5a91f3c0b62
+Revises: c47e2b9a5f13
+Create Date: 2026-10-18 14:05:37.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a91f3c0b62'
+down_revision: Union[str, Sequence[str], None] = 'c47e2b9a5f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SHARED_COLUMNS = (
+    "id, title, url, published_at, topic, summary, author, image_url, "
+    "thumbnail_url, downloaded_at, generic_news, journal_id"
+)
+
+FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_fts_ai AFTER INSERT ON articles BEGIN
+        INSERT INTO articles_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_fts_ad AFTER DELETE ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, title, summary)
+        VALUES ('delete', old.id, old.title, old.summary);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_fts_au AFTER UPDATE OF title, summary ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, title, summary)
+        VALUES ('delete', old.id, old.title, old.summary);
+        INSERT INTO articles_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+    END
+    """,
+]
+
+
+def _article_columns(with_user: bool):
+    columns = [
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('url', sa.String(), nullable=False, unique=with_user),
+        sa.Column('published_at', sa.DateTime(), nullable=False),
+        sa.Column('topic', sa.String(), nullable=True),
+        sa.Column('summary', sa.String(), nullable=True),
+        sa.Column('author', sa.String(), nullable=True),
+        sa.Column('image_url', sa.String(), nullable=True),
+        sa.Column('thumbnail_url', sa.String(), nullable=True),
+        sa.Column('downloaded_at', sa.DateTime(), nullable=False),
+        sa.Column('generic_news', sa.Boolean(), nullable=True),
+        sa.Column('journal_id', sa.Integer(), sa.ForeignKey('journals.id'), nullable=False),
+    ]
+    if with_user:
+        columns.append(sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True))
+    return columns
+
+
+def _rebuild_articles(with_user: bool, table_args=(), insert="INSERT"):
+    # O SQLite não remove colunas/constraints sem recriar a tabela; os
+    # triggers do índice FTS somem junto com ela e são recriados no final.
+    for trigger in ('articles_fts_ai', 'articles_fts_ad', 'articles_fts_au'):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+    op.create_table('articles_new', *_article_columns(with_user), *table_args)
+    op.execute(
+        f"{insert} INTO articles_new ({SHARED_COLUMNS}) "
+        f"SELECT {SHARED_COLUMNS} FROM articles ORDER BY id"
+    )
+    op.drop_table('articles')
+    op.rename_table('articles_new', 'articles')
+    if with_user:
+        op.create_index('ix_articles_user_id_url', 'articles', ['user_id', 'url'])
+
+    for trigger in FTS_TRIGGERS:
+        op.execute(trigger)
+    op.execute("INSERT INTO articles_fts(articles_fts) VALUES ('rebuild')")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _rebuild_articles(
+        with_user=False,
+        table_args=(sa.UniqueConstraint('journal_id', 'url', name='uq_articles_journal_id_url'),)
+    )
+
+    op.create_table(
+        'user_article_states',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('article_id', sa.Integer(), sa.ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('read_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+
+    # Os validadores passam a ser por journal; é só um cache, pode recomeçar vazio.
+    op.drop_table('feed_validators')
+    op.create_table(
+        'feed_validators',
+        sa.Column('journal_id', sa.Integer(), sa.ForeignKey('journals.id'), primary_key=True),
+        sa.Column('etag', sa.String(), nullable=True),
+        sa.Column('last_modified', sa.String(), nullable=True),
+        sa.Column('checked_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('feed_validators')
+    op.create_table(
+        'feed_validators',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('journal_id', sa.Integer(), sa.ForeignKey('journals.id'), primary_key=True),
+        sa.Column('etag', sa.String(), nullable=True),
+        sa.Column('last_modified', sa.String(), nullable=True),
+        sa.Column('checked_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+
+    # Volta ao modelo antigo (url única global); se o mesmo link existir em
+    # dois journals, só a primeira linha é mantida. O dono (user_id) não
+    # pode ser reconstruído e fica nulo.
+    _rebuild_articles(with_user=True, insert="INSERT OR IGNORE")
+
+    op.drop_table('user_article_states')
@@ -0,0 +1,42 @@
+"""Índices compostos das consultas de artigos (journal, tipo, tópico e data)
+
+Revision ID: f4b6c1d8e2a9
+Revises: d2c84e7a9f30
+Create Date: 2026-10-18 18:21:07.415392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b6c1d8e2a9'
+down_revision: Union[str, Sequence[str], None] = 'd2c84e7a9f30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ARTICLE_INDEXES = {
+    'ix_articles_journal_id_published_at': ['journal_id', sa.text('published_at DESC'), sa.text('id DESC')],
+    'ix_articles_published_at': [sa.text('published_at DESC'), sa.text('id DESC')],
+    'ix_articles_generic_news_published_at': ['generic_news', sa.text('published_at DESC'), sa.text('id DESC')],
+    'ix_articles_topic_published_at': ['topic', sa.text('published_at DESC'), sa.text('id DESC')],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, columns in ARTICLE_INDEXES.items():
+        op.create_index(name, 'articles', columns)
+
+    # Estatísticas para o planejador escolher entre os índices novos e o
+    # único (journal_id, url).
+    op.execute("ANALYZE articles")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in ARTICLE_INDEXES:
+        op.drop_index(name, table_name='articles')
@@ -1,28 +1,56 @@
 # api.py
 
 
-from fastapi import Depends, FastAPI, Query, status, HTTPException
-from typing import Optional, List
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from fastapi import BackgroundTasks, Depends, FastAPI, Query, Request, Response, status, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Literal, Optional, List
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 from sqlalchemy import select
 
 
 from core import models
-from journal import update_feeds_for_user
+from scheduler import (
+    REFRESH_JOB_STALE_SECONDS, SCHEDULER_IN_PROCESS, enqueue_refresh, get_refresh_job,
+    seed_new_journal, start_background_scheduler, stop_background_scheduler, wake_scheduler
+)
+from core.async_database import async_engine, dispose_async_engine, get_async_db, get_current_user_async
 from core.database import (
-    create_db_user, create_journal, get_articles_with_filters, 
-    get_current_user, get_db,  
-    get_user_by_email, get_user_by_username, login
+    ARTICLE_LIST_VIEW_COLUMNS, create_db_user, create_journal, get_articles_with_filters, 
+    get_db, get_user_article, get_user_article_changes, get_user_articles, get_user_profile,
+    invalidate_cached_user, set_article_read, get_user_by_email, get_user_by_username, login
+)
+from core.helpers import FeedUnavailableError, create_access_token, discover_rss_feed_async, validate_and_parse_feed_async
+from core.http_client import close_async_client
+from core.export import EXPORT_MEDIA_TYPES, stream_articles_export
+from core.feed_discovery import get_feed_discovery, store_feed_discovery
+from core.metrics import API_REQUESTS_IN_FLIGHT, render_metrics
+from core.query_profiler import (
+    PROFILER_HEADERS, SQL_PROFILER, instrument_engine, report, start_profiling, stop_profiling
 )
-from core.helpers import create_access_token, discover_rss_feed, get_password_hash
-from core.schemas import Article, JournalCreateRequest, JournalCreateResponse, RefreshResponse, User, UserCreate, UserLoginRequest , Token, Journal, UserUpdate
+from core.passwords import PASSWORD_HASH_QUEUE_TIMEOUT, PasswordHasherBusy
+from core.schemas import Article, ArticleChanges, JournalCreateRequest, JournalCreateResponse, RefreshJob, User, UserCreate, UserProfile, UserLoginRequest , Token, Journal, UserUpdate
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Os feeds são atualizados em segundo plano, não nas requisições.
+    if SCHEDULER_IN_PROCESS:
+        start_background_scheduler()
+    yield
+    stop_background_scheduler()
+    await close_async_client()
+    await dispose_async_engine()
+
 
 app = FastAPI(
     title="MyJournal API",
     description="API para acessar os artigos coletados pelo MyJournal.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 origins = [
     "http://localhost:3000",
@@ -36,28 +64,143 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"] + (PROFILER_HEADERS if SQL_PROFILER else []),
 )
 
+
+
+@app.middleware("http")
+async def track_requests_in_flight(request: Request, call_next):
+    with API_REQUESTS_IN_FLIGHT.track_inprogress():
+        return await call_next(request)
+
+
+if SQL_PROFILER:
+    # Perfil de SQL por requisição (SQL_PROFILER=1), para pegar N+1 em CI/staging.
+    instrument_engine(models.engine)
+    instrument_engine(async_engine.sync_engine)
+
+    @app.middleware("http")
+    async def profile_sql_queries(request: Request, call_next):
+        stats, token = start_profiling()
+        try:
+            response = await call_next(request)
+        finally:
+            stop_profiling(token)
+
+        response.headers.update(stats.headers())
+        report(request.method, request.url.path, stats)
+        return response
+
+
 models.setup_database_orm()
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+ArticleView = Literal["full", "list"]
+
+
+@app.exception_handler(PasswordHasherBusy)
+def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    # Rajada de logins/cadastros: recusa rápido em vez de enfileirar sem limite.
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, int(PASSWORD_HASH_QUEUE_TIMEOUT)))},
+    )
+
+
+def _serialize_article_page(response: Response, articles, next_cursor, view: ArticleView):
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    if view == "full":
+        return articles
+
+    # Na visão de lista o 'summary' não foi carregado (load_only): monta o
+    # schema só com as colunas carregadas para não disparar um lazy load por linha.
+    return [
+        Article.model_validate({
+            **{column.key: getattr(article, column.key) for column in ARTICLE_LIST_VIEW_COLUMNS},
+            "summary": None,
+            "journal": article.journal,
+        })
+        for article in articles
+    ]
+
+
+# Os handlers são async e usam AsyncSession; as consultas de core.database
+# rodam nela via run_sync. Login e cadastro ficam síncronos: o argon2
+# espera pelo pool de hashing (core.passwords) e isso bloquearia o event loop.
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # Formato de exposição do Prometheus; as métricas são deste processo.
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/articles/", response_model=List[Article])
-def read_articles(
-    db: Session = Depends(get_db),
+async def read_articles(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     topics: Optional[List[str]] = Query(None),
     sources: Optional[List[str]] = Query(None),
     search: Optional[str] = Query(None, alias="title_search"),
-    generic: Optional[bool] = Query(None, alias="generic_news")
+    generic: Optional[bool] = Query(None, alias="generic_news"),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    view: ArticleView = Query("full"),
+    sort: Literal["recent", "relevance"] = Query("recent")
 ):
-    articles_data = get_articles_with_filters(
-        db=db, 
-        topics=topics,
-        sources=sources,
-        title_search=search,
-        generic_news=generic
+    try:
+        articles_data, next_cursor = await db.run_sync(
+            get_articles_with_filters,
+            topics=topics,
+            sources=sources,
+            title_search=search,
+            generic_news=generic,
+            limit=limit,
+            cursor=cursor,
+            include_summary=(view == "full"),
+            sort_by_relevance=(sort == "relevance")
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return _serialize_article_page(response, articles_data, next_cursor, view)
+
+@app.get("/articles/export")
+async def export_articles(
+    export_format: Literal["ndjson", "arrow", "parquet"] = Query("ndjson", alias="format"),
+    include_summary: bool = Query(True),
+    topics: Optional[List[str]] = Query(None),
+    sources: Optional[List[str]] = Query(None),
+    generic: Optional[bool] = Query(None, alias="generic_news"),
+    since: Optional[datetime] = Query(None)
+):
+    """
+    Exporta o arquivo inteiro (ou filtrado) em streaming, para análise
+    offline. Arrow é o formato IPC de stream; Arrow e Parquet precisam do pyarrow.
+    """
+    try:
+        chunks = stream_articles_export(
+            export_format=export_format,
+            include_summary=include_summary,
+            topics=topics,
+            sources=sources,
+            generic_news=generic,
+            since=since
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="articles.{export_format}"'}
     )
-    return articles_data
+
 
 @app.post("/api/login/", response_model=Token)
 def login_for_user(
@@ -122,7 +265,7 @@ def register_user(
     
     except Exception as e:
         db.rollback() 
-        if isinstance(e, HTTPException):
+        if isinstance(e, (HTTPException, PasswordHasherBusy)):
             raise e
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -134,65 +277,164 @@ def register_user(
     "/api/articles/me", 
     response_model=List[Article],
 )
-def get_my_articles(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_my_articles(
+    response: Response,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    view: ArticleView = Query("full"),
+    unread: bool = Query(False),
+    journal_id: Optional[int] = Query(None)
 ):
-    articles = db.query(models.Article).filter(
-        models.Article.user_id == current_user.id
-    ).options(
-        selectinload(models.Article.journal) 
-    ).order_by(
-        models.Article.published_at.desc() 
-    ).all()
-    return articles
+    try:
+        articles, next_cursor = await db.run_sync(
+            get_user_articles,
+            user_id=current_user.id,
+            limit=limit,
+            cursor=cursor,
+            include_summary=(view == "full"),
+            unread_only=unread,
+            journal_id=journal_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return _serialize_article_page(response, articles, next_cursor, view)
+
+
+@app.get("/api/articles/me/changes", response_model=ArticleChanges)
+async def get_my_article_changes(
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+    since: Optional[int] = Query(None, ge=0),
+    limit: int = Query(500, ge=1, le=1000)
+):
+    """
+    Sincronização incremental: devolve só o que mudou depois de 'since'.
+    O cliente guarda o 'cursor' devolvido e o envia na próxima chamada;
+    sem 'since' só o cursor atual é devolvido, para usar após a carga inicial.
+    """
+    return await db.run_sync(get_user_article_changes, user_id=current_user.id, since=since, limit=limit)
+
+
+@app.put("/api/articles/{article_id}/read", status_code=status.HTTP_204_NO_CONTENT)
+async def mark_article_read(
+    article_id: int,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if await db.run_sync(get_user_article, user_id=current_user.id, article_id=article_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Artigo não encontrado")
+    await db.run_sync(set_article_read, user_id=current_user.id, article_id=article_id, read=True)
+
+
+@app.delete("/api/articles/{article_id}/read", status_code=status.HTTP_204_NO_CONTENT)
+async def mark_article_unread(
+    article_id: int,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if await db.run_sync(get_user_article, user_id=current_user.id, article_id=article_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Artigo não encontrado")
+    await db.run_sync(set_article_read, user_id=current_user.id, article_id=article_id, read=False)
 
 @app.post(
     "/api/journal", 
     response_model=JournalCreateResponse,
 )
-def add_user_journal(
+async def add_user_journal(
     request_data: JournalCreateRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     url_str = str(request_data.url).rstrip('/')
 
     try:
-        for existing_journal in current_user.journals:
+        user_journals = await db.run_sync(lambda _: current_user.journals)
+        for existing_journal in user_journals:
             if existing_journal.url == request_data.url:
                 return existing_journal
             
         statement = select(models.Journal).where(models.Journal.url == url_str)
-        journal_in_db = db.scalars(statement).first()
+        journal_in_db = (await db.scalars(statement)).first()
 
         if journal_in_db:
             return journal_in_db
             
-        discovered_rss_url_str = discover_rss_feed(url_str)
-            
+        # A descoberta fica em cache por site, inclusive quando o site não
+        # tem feed: uma nova tentativa responde sem varrer o site de novo.
+        # Falhas passageiras (FeedUnavailableError) não entram no cache.
+        discovery = await db.run_sync(get_feed_discovery, url_str)
+        if discovery is not None and discovery.feed_url is None:
+            raise ValueError(discovery.error or f"Nenhum feed RSS pôde ser encontrado em '{url_str}'")
+
+        if discovery is not None:
+            discovered_rss_url_str = discovery.feed_url
+        else:
+            # Descoberta e validação do feed pelo cliente HTTP assíncrono.
+            try:
+                discovered_rss_url_str = await discover_rss_feed_async(url_str)
+            except FeedUnavailableError:
+                raise
+            except ValueError as e:
+                await db.run_sync(store_feed_discovery, url_str, None, str(e))
+                raise
+
+        statement = select(models.Journal).where(models.Journal.rss == discovered_rss_url_str)
+        feed_title = None
+        feed = None
+        if (await db.scalars(statement)).first() is None:
+            try:
+                feed_title, feed = await validate_and_parse_feed_async(discovered_rss_url_str)
+            except FeedUnavailableError:
+                raise
+            except ValueError as e:
+                await db.run_sync(store_feed_discovery, url_str, None, str(e))
+                raise
+
+        if discovery is None:
+            await db.run_sync(store_feed_discovery, url_str, discovered_rss_url_str)
+
+        def subscribe(session: Session):
+            journal = create_journal(
+                db=session, 
+                rss_url=discovered_rss_url_str,
+                url=url_str,
+                feed_title=feed_title
+            )
+            if feed is not None and journal.next_refresh_at is None and journal.refresh_leased_until is None:
+                # A carga inicial usa o feed já validado; até ela terminar
+                # o journal fica reservado, como em claim_due_journals.
+                journal.refresh_leased_until = datetime.now() + timedelta(seconds=REFRESH_JOB_STALE_SECONDS)
+            if journal not in current_user.journals:
+                current_user.journals.append(journal)
+            return journal
+
+        journal_to_add = await db.run_sync(subscribe)
+        
+        await db.commit()
+        await db.refresh(journal_to_add) 
 
-        journal_to_add = create_journal(
-            db=db, 
-            rss_url=discovered_rss_url_str,
-            url=request_data.url
-        )
+        invalidate_cached_user(current_user.id)
 
-        current_user.journals.append(journal_to_add)
-        
-        db.commit()
-        db.refresh(journal_to_add) 
+        if feed is not None:
+            background_tasks.add_task(seed_new_journal, journal_to_add.id, feed)
+        else:
+            # Journal novo ainda não tem agenda: o scheduler o lê no próximo ciclo.
+            wake_scheduler()
         
         return journal_to_add
 
     except ValueError as e:
-        db.rollback() 
+        await db.rollback() 
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Um erro inesperado ocorreu ao associar o journal: {str(e)}"
@@ -203,59 +445,61 @@ def add_user_journal(
     "/api/journal/me", 
     response_model=List[JournalCreateResponse],
 )
-def get_my_articles(
-    current_user: User = Depends(get_current_user)
+async def get_my_articles(
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return current_user.journals
+    return await db.run_sync(lambda _: list(current_user.journals))
 
-@app.post("/api/articles/me/refresh", response_model=RefreshResponse)
-def update_my_journal_feeds(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+@app.post(
+    "/api/articles/me/refresh",
+    response_model=RefreshJob,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def update_my_journal_feeds(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
-
+    # Só enfileira: o scheduler baixa os feeds e o cliente acompanha pelo id.
     try:
-        refresh_result = update_feeds_for_user(db=db, user=current_user)
+        return await db.run_sync(enqueue_refresh, user_id=current_user.id)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Falha ao atualizar feeds: {e}")
-    
-    try:
-        articles_list = db.query(models.Article).filter(
-            models.Article.user_id == current_user.id
-        ).options(
-            selectinload(models.Article.journal) 
-        ).order_by(
-            models.Article.published_at.desc() 
-        ).all()
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Falha ao buscar artigos após atualização: {e}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Falha ao agendar atualização: {e}")
 
-    return {
-        "refresh_details": refresh_result,
-        "articles": articles_list
-    }
+
+@app.get("/api/articles/me/refresh/{job_id}", response_model=RefreshJob)
+async def get_my_refresh_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    job = await db.run_sync(get_refresh_job, user_id=current_user.id, job_id=job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job não encontrado")
+    return job
     
 @app.get(
     "/api/users/me", 
-    response_model=User,
+    response_model=UserProfile,
 )
-def get_my_articles(
-    current_user: User = Depends(get_current_user)
+async def get_my_articles(
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return current_user
+    return await db.run_sync(get_user_profile, user=current_user)
 
 
-@app.patch("/api/users/me", response_model=User)
-def update_user_me(
+@app.patch("/api/users/me", response_model=UserProfile)
+async def update_user_me(
     user_in: UserUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     
     
     if user_in.email is not None and user_in.email != current_user.email:
-        user_exists = get_user_by_email(db, email=user_in.email)
+        user_exists = await db.run_sync(get_user_by_email, email=user_in.email)
         if user_exists:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -264,7 +508,7 @@ def update_user_me(
         current_user.email = user_in.email
 
     if user_in.username is not None and user_in.username != current_user.username:
-        user_exists = get_user_by_username(db, username=user_in.username)
+        user_exists = await db.run_sync(get_user_by_username, username=user_in.username)
         if user_exists:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -279,11 +523,12 @@ def update_user_me(
 
     try:
         db.add(current_user)
-        db.commit()
-        db.refresh(current_user)
-        return current_user
+        await db.commit()
+        invalidate_cached_user(current_user.id)
+        await db.refresh(current_user)
+        return await db.run_sync(get_user_profile, user=current_user)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao atualizar perfil: {str(e)}"
@@ -1,68 +1,98 @@
 import streamlit as st
-import sqlite3
-import pandas as pd
 
 
-from core.database import load_all_articles_as_df
+from core.analytics import count_articles, get_data_version, load_articles_frame, load_filter_options
+from core.database import SessionLocal
 
-DB_NAME = "my_journal.db"
+PAGE_SIZES = [25, 50, 100, 250]
 
 
 st.set_page_config(page_title="MyJournal", layout="wide")
 st.title("MyJournal - Arquivo de Notícias 📰")
 
-df = load_all_articles_as_df()
-if df.empty:
+
+# As consultas ficam em cache até o banco mudar: 'version' é o contador de
+# mudanças dos artigos e faz parte da chave de cada cache abaixo.
+@st.cache_data(ttl=10, show_spinner=False)
+def cached_data_version() -> int:
+    with SessionLocal() as db:
+        return get_data_version(db)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def cached_filter_options(version: int) -> dict:
+    with SessionLocal() as db:
+        return load_filter_options(db)
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def cached_count(version: int, generic, topics, sources, title_search) -> int:
+    with SessionLocal() as db:
+        return count_articles(db, generic, topics, sources, title_search)
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def cached_page(version: int, generic, topics, sources, title_search, page_size: int, page: int):
+    with SessionLocal() as db:
+        return load_articles_frame(
+            db, generic, topics, sources, title_search,
+            limit=page_size, offset=(page - 1) * page_size
+        )
+
+
+def render_articles(key: str, version: int, generic: bool, topics, sources, title_search):
+    total = cached_count(version, generic, topics, sources, title_search)
+    total_generic = cached_count(version, generic, None, None, None)
+    st.subheader(f"Exibindo {total} de {total_generic} artigos encontrados")
+
+    if not total:
+        return
+
+    col_size, col_page = st.columns(2)
+    page_size = col_size.selectbox("Artigos por página", PAGE_SIZES, index=1, key=f"{key}_page_size")
+    pages = (total + page_size - 1) // page_size
+    page = col_page.number_input(f"Página (de {pages})", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+
+    df = cached_page(version, generic, topics, sources, title_search, page_size, int(page))
+    st.dataframe(
+        df.drop(columns=["id", "generic_news"]),
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "URL": st.column_config.LinkColumn("URL"),
+            "published_at": st.column_config.DatetimeColumn("Publicado em", format="DD/MM/YYYY HH:mm"),
+        },
+    )
+
+
+version = cached_data_version()
+options = cached_filter_options(version)
+
+if not options["sources"]:
     st.warning("O banco de dados está vazio. Execute o script principal de coleta de notícias primeiro.")
 else:
     st.sidebar.header("Filtros")
-    
-    all_topics = df['Tópico'].unique()
+
+    all_topics = options["topics"]
     selected_topics = st.sidebar.multiselect("Filtrar por Tópico:", options=all_topics, default=all_topics)
 
-    all_sources = df['Fonte'].unique()
+    all_sources = options["sources"]
     selected_sources = st.sidebar.multiselect("Filtrar por Fonte:", options=all_sources, default=all_sources)
 
     search_title = st.sidebar.text_input("Buscar no Título:")
-    
-    df_specific = df[df['generic_news'] == 0] 
-    
-    df_generic = df[df['generic_news'] == 1]
-    
+
+    # Tudo selecionado equivale a não filtrar: evita um IN com todos os valores.
+    # Tuplas porque os argumentos fazem parte da chave do cache.
+    topics = None if set(selected_topics) == set(all_topics) else tuple(sorted(selected_topics))
+    sources = None if set(selected_sources) == set(all_sources) else tuple(sorted(selected_sources))
+    search_title = search_title.strip() or None
+
     tab_specific, tab_generic = st.tabs(["Notícias Específicas (RSS)", "Notícias Gerais (Tópicos)"])
 
     with tab_specific:
         st.header("Notícias Específicas (ICL, Meu Timão, etc.)")
-        
-   
-        filtered_df_specific = df_specific[
-            df_specific['Tópico'].isin(selected_topics) &
-            df_specific['Fonte'].isin(selected_sources)
-        ]
-        if search_title:
-            filtered_df_specific = filtered_df_specific[filtered_df_specific['Título'].str.contains(search_title, case=False, na=False)]
-
- 
-        st.subheader(f"Exibindo {len(filtered_df_specific)} de {len(df_specific)} artigos específicos encontrados")
-        for index, row in filtered_df_specific.iterrows():
-            st.markdown(f"### [{row['Título']}]({row['URL']})")
-            st.write(f"**Fonte:** {row['Fonte']} | **Tópico:** {row['Tópico']}")
-            st.write(f"**Publicado em:** {row['published_at']}")
-            st.divider() 
+        render_articles("specific", version, False, topics, sources, search_title)
 
     with tab_generic:
         st.header("Notícias Gerais (Tecnologia, Esportes, etc.)")
-        
-        filtered_df_generic = df_generic[
-            df_generic['Tópico'].isin(selected_topics) &
-            df_generic['Fonte'].isin(selected_sources)
-        ]
-        if search_title:
-            filtered_df_generic = filtered_df_generic[filtered_df_generic['Título'].str.contains(search_title, case=False, na=False)]
-
-        st.subheader(f"Exibindo {len(filtered_df_generic)} de {len(df_generic)} artigos gerais encontrados")
-        for index, row in filtered_df_generic.iterrows():
-            st.markdown(f"### [{row['Título']}]({row['URL']})")
-            st.write(f"**Fonte:** {row['Fonte']} | **Tópico:** {row['Tópico']}")
-            st.write(f"**Publicado em:** {row['published_at']}")
-            st.divider()
\ No newline at end of file
+        render_articles("generic", version, True, topics, sources, search_title)
@@ -0,0 +1,84 @@
+# benchmarks/bench_auth.py
+"""
+Microbenchmark do custo de autenticação por request: get_current_user com
+o cache de usuário desligado (decodifica o JWT e faz o SELECT do usuário)
+e ligado (só a consulta ao cache e o merge na sessão).
+
+Usa um banco SQLite temporário. Rode a partir de backend/:
+
+    python benchmarks/bench_auth.py [--requests 5000]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DB_NAME"] = os.path.join(tempfile.mkdtemp(prefix="bench_auth_"), "bench.db")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+from core import models  # noqa: E402
+from core.auth_cache import principal_cache  # noqa: E402
+from core.database import SessionLocal, get_current_user  # noqa: E402
+from core.helpers import create_access_token  # noqa: E402
+
+
+def _setup_user() -> str:
+    models.setup_database_orm()
+    with SessionLocal() as db:
+        user = models.User(username="bench", email="bench@example.com", hashed_password="x")
+        for i in range(5):
+            user.journals.append(models.Journal(name=f"journal {i}", url=f"https://j{i}.example.com", rss=f"https://j{i}.example.com/rss"))
+        db.add(user)
+        db.commit()
+        return create_access_token(data={"email": user.email, "id": user.id})
+
+
+def _measure(token: str, requests: int) -> list[float]:
+    timings = []
+    for _ in range(requests):
+        # Uma sessão por request, como o get_db da API.
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            user = get_current_user(token=token, db=db)
+            user.id
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _report(label: str, timings: list[float]):
+    timings = sorted(timings)
+    p50 = statistics.median(timings) * 1e6
+    p99 = timings[int(len(timings) * 0.99) - 1] * 1e6
+    mean = statistics.fmean(timings) * 1e6
+    print(f"{label:<14} média {mean:8.1f} µs   p50 {p50:8.1f} µs   p99 {p99:8.1f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    token = _setup_user()
+    ttl = principal_cache.ttl_seconds or 60
+
+    principal_cache.ttl_seconds = 0
+    _measure(token, 100)
+    without_cache = _measure(token, args.requests)
+
+    principal_cache.ttl_seconds = ttl
+    principal_cache.clear()
+    _measure(token, 100)
+    with_cache = _measure(token, args.requests)
+
+    print(f"get_current_user, {args.requests} requests")
+    _report("sem cache", without_cache)
+    _report("com cache", with_cache)
+    print(f"acertos do cache: {principal_cache.hits}, falhas: {principal_cache.misses}")
+
+
+if __name__ == "__main__":
+    main()
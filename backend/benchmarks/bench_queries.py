@@ -0,0 +1,186 @@
+# benchmarks/bench_queries.py
+"""
+Planos e latências das consultas quentes de artigos num arquivo sintético:
+o feed do usuário (/api/articles/me), o arquivo com filtros (/articles),
+o perfil (/api/users/me) e a varredura por data da limpeza. Mede com os
+índices compostos de articles e depois sem eles.
+
+Usa um banco SQLite temporário. Rode a partir de backend/:
+
+    python benchmarks/bench_queries.py [--articles 200000] [--journals 60] [--repeat 30]
+"""
+
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DB_NAME"] = os.path.join(tempfile.mkdtemp(prefix="bench_queries_"), "bench.db")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+from sqlalchemy import event, func, insert, select  # noqa: E402
+
+from core import models  # noqa: E402
+from core.database import SessionLocal, get_articles_with_filters, get_user_articles, get_user_profile  # noqa: E402
+
+TOPICS = ["tecnologia", "esportes", "política", "economia", "saúde", "cultura", "ciência", "mundo"]
+USERS = 20
+SUBSCRIPTIONS_PER_USER = 10
+
+
+def _seed(articles: int, journals: int):
+    models.setup_database_orm()
+    random.seed(42)
+    now = datetime.datetime.now()
+
+    with models.engine.begin() as connection:
+        connection.execute(insert(models.User), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": "x"}
+            for i in range(1, USERS + 1)
+        ])
+        connection.execute(insert(models.Journal), [
+            {"id": i, "name": f"journal {i}", "url": f"https://j{i}.example.com", "rss": f"https://j{i}.example.com/rss"}
+            for i in range(1, journals + 1)
+        ])
+        connection.execute(insert(models.user_journal_association), [
+            {"user_id": user_id, "journal_id": journal_id}
+            for user_id in range(1, USERS + 1)
+            for journal_id in random.sample(range(1, journals + 1), min(SUBSCRIPTIONS_PER_USER, journals))
+        ])
+
+        batch = []
+        for i in range(1, articles + 1):
+            published_at = now - datetime.timedelta(seconds=random.randint(0, 365 * 24 * 3600))
+            batch.append({
+                "title": f"Artigo {i} sobre {random.choice(TOPICS)}",
+                "url": f"https://example.com/a/{i}",
+                "published_at": published_at,
+                "topic": random.choice(TOPICS),
+                "summary": None,
+                "downloaded_at": published_at,
+                "generic_news": random.random() < 0.3,
+                "journal_id": random.randint(1, journals),
+            })
+            if len(batch) == 10000:
+                connection.execute(insert(models.Article), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(models.Article), batch)
+
+        # Um quinto dos artigos do usuário 1 já lidos, para o filtro de não lidos.
+        subscribed = select(models.user_journal_association.c.journal_id).where(
+            models.user_journal_association.c.user_id == 1
+        )
+        read_ids = connection.scalars(select(models.Article.id).where(models.Article.journal_id.in_(subscribed))).all()
+        connection.execute(insert(models.UserArticleState), [
+            {"user_id": 1, "article_id": article_id}
+            for article_id in random.sample(read_ids, len(read_ids) // 5)
+        ])
+
+        connection.exec_driver_sql("ANALYZE")
+
+
+def _cases(db) -> list:
+    user = db.get(models.User, 1)
+    _, cursor = get_user_articles(db, user.id, limit=50, include_summary=False)
+    journal_id = user.journals[0].id
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=180)
+
+    return [
+        ("feed do usuário", lambda: get_user_articles(db, user.id, limit=50, include_summary=False)),
+        ("feed, página 2", lambda: get_user_articles(db, user.id, limit=50, cursor=cursor, include_summary=False)),
+        ("feed, não lidos", lambda: get_user_articles(db, user.id, limit=50, include_summary=False, unread_only=True)),
+        ("feed, um journal", lambda: get_user_articles(db, user.id, limit=50, include_summary=False, journal_id=journal_id)),
+        ("arquivo geral", lambda: get_articles_with_filters(db, limit=50, include_summary=False)),
+        ("notícias gerais", lambda: get_articles_with_filters(db, generic_news=True, limit=50, include_summary=False)),
+        ("por tópico", lambda: get_articles_with_filters(db, topics=["tecnologia"], generic_news=True, limit=50, include_summary=False)),
+        ("limpeza (faixa)", lambda: db.scalar(select(func.count()).where(models.Article.published_at < cutoff))),
+        ("perfil", lambda: get_user_profile(db, user)),
+    ]
+
+
+def _query_plan(fn) -> list[str]:
+    """Plano (EXPLAIN QUERY PLAN) da primeira consulta que 'fn' executa."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(models.engine, "before_cursor_execute", capture)
+    try:
+        fn()
+    finally:
+        event.remove(models.engine, "before_cursor_execute", capture)
+
+    statement, parameters = statements[0]
+    with models.engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in rows]
+
+
+def _measure(fn, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _run(label: str, repeat: int) -> dict:
+    print(f"\n=== {label} ===")
+    results = {}
+    with SessionLocal() as db:
+        for name, fn in _cases(db):
+            fn()
+            plan = _query_plan(fn)
+            timings = sorted(_measure(fn, repeat))
+            db.expire_all()
+            results[name] = statistics.median(timings) * 1e3
+            p99 = timings[max(0, int(len(timings) * 0.99) - 1)] * 1e3
+            print(f"{name:<18} p50 {results[name]:8.2f} ms   p99 {p99:8.2f} ms")
+            for line in plan:
+                print(f"    {line}")
+    return results
+
+
+def _drop_article_indexes():
+    names = [
+        index.name for index in models.Article.__table__.indexes
+        if index.name.startswith("ix_articles_")
+    ]
+    with models.engine.begin() as connection:
+        for name in names:
+            connection.exec_driver_sql(f"DROP INDEX {name}")
+        connection.exec_driver_sql("ANALYZE")
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=200000)
+    parser.add_argument("--journals", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    _seed(args.articles, args.journals)
+    print(f"{args.articles} artigos em {args.journals} journals criados em {time.perf_counter() - started:.1f}s")
+
+    with_indexes = _run("com os índices compostos", args.repeat)
+    dropped = _drop_article_indexes()
+    without_indexes = _run(f"sem {', '.join(dropped)}", args.repeat)
+
+    print("\n=== resumo (p50) ===")
+    for name, elapsed in with_indexes.items():
+        before = without_indexes[name]
+        print(f"{name:<18} {before:8.2f} ms -> {elapsed:8.2f} ms   ({before / elapsed:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# core/analytics.py
+"""
+Camada de dados do dashboard Streamlit (app.py).
+
+Os filtros (tipo de notícia, tópico, fonte e busca no título) viram SQL, e
+só a página exibida é carregada, já em colunas. Assim o dashboard não
+depende do tamanho do arquivo de artigos.
+"""
+
+from typing import Optional, Sequence
+
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from core.database import get_change_cursor, search_articles_subquery
+from core.models import Article, Journal
+
+# Nomes das colunas exibidas no dashboard.
+ARTICLE_FRAME_COLUMNS = ["id", "Título", "URL", "Tópico", "Fonte", "published_at", "generic_news"]
+CATEGORICAL_COLUMNS = ["Tópico", "Fonte"]
+
+
+def get_data_version(db: Session) -> int:
+    """
+    Contador de mudanças dos artigos (o cursor de article_changes). Muda a
+    cada inserção ou exclusão, então serve de chave para o cache do dashboard.
+    """
+    return get_change_cursor(db)
+
+
+def _filtered_articles(
+    generic: Optional[bool],
+    topics: Optional[Sequence[str]],
+    sources: Optional[Sequence[str]],
+    title_search: Optional[str]
+):
+    stmt = select(Article.id).join(Journal, Journal.id == Article.journal_id)
+
+    if generic is not None:
+        stmt = stmt.where(Article.generic_news == generic)
+    if topics is not None:
+        stmt = stmt.where(Article.topic.in_(list(topics)))
+    if sources is not None:
+        stmt = stmt.where(Journal.name.in_(list(sources)))
+    if title_search:
+        search = search_articles_subquery(title_search, column="title")
+        if search is not None:
+            stmt = stmt.join(search, search.c.article_id == Article.id)
+
+    return stmt
+
+
+def load_filter_options(db: Session, generic: Optional[bool] = None) -> dict:
+    """Tópicos e fontes distintos, para montar os filtros da barra lateral."""
+    topic_stmt = select(Article.topic).where(Article.topic.is_not(None)).distinct().order_by(Article.topic)
+    source_stmt = select(Journal.name).join(Article, Article.journal_id == Journal.id).distinct().order_by(Journal.name)
+
+    if generic is not None:
+        topic_stmt = topic_stmt.where(Article.generic_news == generic)
+        source_stmt = source_stmt.where(Article.generic_news == generic)
+
+    return {
+        "topics": list(db.scalars(topic_stmt)),
+        "sources": list(db.scalars(source_stmt)),
+    }
+
+
+def count_articles(
+    db: Session,
+    generic: Optional[bool] = None,
+    topics: Optional[Sequence[str]] = None,
+    sources: Optional[Sequence[str]] = None,
+    title_search: Optional[str] = None
+) -> int:
+    filtered = _filtered_articles(generic, topics, sources, title_search).subquery()
+    return db.scalar(select(func.count()).select_from(filtered))
+
+
+def load_articles_frame(
+    db: Session,
+    generic: Optional[bool] = None,
+    topics: Optional[Sequence[str]] = None,
+    sources: Optional[Sequence[str]] = None,
+    title_search: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0
+) -> pd.DataFrame:
+    """
+    Uma página de artigos como DataFrame, mais recentes primeiro. 'topics'
+    e 'sources' None significam "sem filtro"; o resumo não é carregado.
+    Tópico e fonte vêm como categóricos.
+    """
+    filtered = _filtered_articles(generic, topics, sources, title_search).subquery()
+
+    stmt = (
+        select(
+            Article.id, Article.title, Article.url, Article.topic,
+            Journal.name, Article.published_at, Article.generic_news
+        )
+        .join(filtered, filtered.c.id == Article.id)
+        .join(Journal, Journal.id == Article.journal_id)
+        .order_by(Article.published_at.desc(), Article.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+
+    rows = db.execute(stmt).all()
+    columns = list(zip(*rows)) if rows else [[] for _ in ARTICLE_FRAME_COLUMNS]
+    frame = pd.DataFrame(dict(zip(ARTICLE_FRAME_COLUMNS, columns)))
+
+    frame["published_at"] = pd.to_datetime(frame["published_at"])
+    frame["generic_news"] = frame["generic_news"].astype("boolean")
+    for column in CATEGORICAL_COLUMNS:
+        frame[column] = frame[column].astype("category")
+
+    return frame
+
@@ -0,0 +1,44 @@
+# core/async_database.py
+"""
+Sessão assíncrona (AsyncSession) e dependências dos handlers async da API.
+
+As consultas de core.database continuam escritas para Session e são
+reaproveitadas com AsyncSession.run_sync: rodam sobre a conexão assíncrona
+(aiosqlite ou asyncpg), então a espera pelo banco não ocupa uma thread.
+"""
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.auth_cache import principal_cache
+from core.database import _remember_user, _token_claims, _user_from_cache, oauth2_scheme
+from core.engine import build_async_engine
+from core.models import DATABASE_URL, User
+
+async_engine = build_async_engine(DATABASE_URL)
+
+# expire_on_commit=False: depois do commit os atributos continuam legíveis
+# sem um novo SELECT, que numa sessão assíncrona precisaria de await.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    cached = principal_cache.get(token)
+    if cached is not None:
+        return await db.run_sync(_user_from_cache, cached)
+
+    claims = _token_claims(token)
+    user = await db.get(User, claims['id'])
+    return _remember_user(token, user, claims.get('exp'))
+
+
+async def dispose_async_engine():
+    await async_engine.dispose()
@@ -0,0 +1,95 @@
+# core/auth_cache.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+# Por quanto tempo o usuário resolvido a partir de um token é reaproveitado.
+# Com 0 o cache fica desligado e todo request consulta o banco.
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "1024"))
+
+
+class PrincipalCache:
+    """
+    Cache LRU com TTL de token JWT -> colunas do usuário. Só guarda tokens
+    que já passaram pela verificação de assinatura, e nunca além do 'exp'
+    do próprio token. Um índice por user_id permite invalidar todos os
+    tokens de um usuário quando ele é alterado.
+    """
+
+    def __init__(self, ttl_seconds: float = AUTH_CACHE_TTL_SECONDS, max_entries: int = AUTH_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._tokens_by_user = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[dict]:
+        if self.ttl_seconds <= 0:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            user_id, values, expires_at = entry
+            if expires_at <= now:
+                self._remove(token, user_id)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return values
+
+    def put(self, token: str, user_id: int, values: dict, token_exp: Optional[float] = None):
+        if self.ttl_seconds <= 0:
+            return
+
+        expires_at = time.time() + self.ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+
+        with self._lock:
+            if token in self._entries:
+                self._remove(token, self._entries[token][0])
+            self._entries[token] = (user_id, values, expires_at)
+            self._tokens_by_user.setdefault(user_id, set()).add(token)
+
+            while len(self._entries) > self.max_entries:
+                oldest_token, (oldest_user_id, _, _) = next(iter(self._entries.items()))
+                self._remove(oldest_token, oldest_user_id)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for token in self._tokens_by_user.pop(user_id, set()):
+                self._entries.pop(token, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _remove(self, token: str, user_id: int):
+        self._entries.pop(token, None)
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user_id]
+
+
+principal_cache = PrincipalCache()
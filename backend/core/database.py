@@ -1,21 +1,26 @@
 # core/database.py
 
+import base64
 import datetime
+import re
 import sqlite3
 from zoneinfo import ZoneInfo 
 from fastapi.params import Depends
 import pandas as pd
 # Importações necessárias do SQLAlchemy e FastAPI
-from sqlalchemy.orm import sessionmaker, Session 
-from sqlalchemy import delete, func, select 
-from typing import Optional, List
-from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import load_only, make_transient_to_detached, selectinload, sessionmaker, Query, Session 
+from sqlalchemy import and_, delete, exists, func, literal_column, or_, select, text 
+from typing import Optional, List, Tuple
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import HTTPException, status
 
 from core.schemas import UserCreate
-from core.helpers import  decode_access_token, get_password_hash, parse_datetime, validate_and_parse_feed, verify_password
-from core.models import Article, User, engine, Journal
+from core.auth_cache import principal_cache
+from core.helpers import  decode_access_token, get_password_hash, parse_datetime, validate_and_parse_feed, verify_and_update_password
+from core.engine import dialect_insert
+from core.metrics import count_articles, observe_stage
+from core.retention import run_retention
+from core.models import Article, ArticleChange, User, UserArticleState, engine, Journal, user_journal_association
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/login")
 
@@ -31,34 +36,389 @@ def get_db():
 
 
 
+# Colunas carregadas na visão de lista: tudo menos o corpo extraído ('summary').
+ARTICLE_LIST_VIEW_COLUMNS = [
+    Article.id, Article.title, Article.url, Article.author, Article.image_url,
+    Article.thumbnail_url, Article.published_at, Article.topic, Article.generic_news,
+    Article.journal_id
+]
+
+
+def encode_article_cursor(article: Article) -> str:
+    """Cursor opaco com a posição (published_at, id) do último artigo da página."""
+    raw = f"{article.published_at.isoformat()}|{article.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_article_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        published_at, article_id = base64.urlsafe_b64decode(padded).decode().rsplit("|", 1)
+        return datetime.datetime.fromisoformat(published_at), int(article_id)
+    except Exception:
+        raise ValueError("Cursor de paginação inválido.")
+
+
+def build_search_query(search: str) -> Optional[str]:
+    """
+    Converte o texto digitado numa expressão MATCH do FTS5: cada palavra
+    vira um termo de prefixo entre aspas ("educa"*), todos obrigatórios.
+    As aspas impedem que o texto do usuário seja lido como sintaxe do FTS5.
+    """
+    terms = re.findall(r"\w+", search or "")
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def search_articles_subquery(search: str, column: Optional[str] = None):
+    """
+    Subconsulta (article_id, rank) com os artigos que casam com a busca.
+    Com 'column' ("title" ou "summary") a busca fica restrita a essa coluna.
+    """
+    if engine.dialect.name == "postgresql":
+        return _search_articles_subquery_postgres(search, column)
+
+    match = build_search_query(search)
+    if match is None:
+        return None
+    if column is not None:
+        match = f"{column} : ({match})"
+
+    return select(
+        literal_column("articles_fts.rowid").label("article_id"),
+        literal_column("articles_fts.rank").label("rank"),
+    ).select_from(
+        text("articles_fts")
+    ).where(
+        text("articles_fts MATCH :search_query").bindparams(search_query=match)
+    ).subquery("article_search")
+
+
+def _search_articles_subquery_postgres(search: str, column: Optional[str] = None):
+    """
+    A mesma busca no PostgreSQL, com tsvector/tsquery sobre as expressões
+    indexadas em setup_search_index. O rank é negado para que, como no
+    FTS5, valores menores signifiquem mais relevância.
+    """
+    terms = re.findall(r"\w+", search or "")
+    if not terms:
+        return None
+
+    # Literais, e não parâmetros, para a expressão bater com a do índice.
+    empty = literal_column("''")
+    if column == "title":
+        document = func.coalesce(Article.title, empty)
+    elif column == "summary":
+        document = func.coalesce(Article.summary, empty)
+    else:
+        document = func.coalesce(Article.title, empty).op("||")(literal_column("' '")).op("||")(func.coalesce(Article.summary, empty))
+
+    vector = func.to_tsvector(literal_column("'simple'"), document)
+    query = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{term}:*" for term in terms))
+
+    return select(
+        Article.id.label("article_id"),
+        (-func.ts_rank(vector, query)).label("rank"),
+    ).where(
+        vector.op("@@")(query)
+    ).subquery("article_search")
+
+
+def paginate_articles(
+    query: Query,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_summary: bool = True,
+    rank_column=None
+) -> Tuple[List[Article], Optional[str]]:
+    """
+    Paginação por keyset em (published_at desc, id desc). Sem 'limit'
+    devolve todas as linhas, como antes. O segundo valor é o cursor da
+    próxima página, ou None quando não há mais artigos.
+
+    Com 'rank_column' os artigos são ordenados por relevância; nesse modo
+    não há cursor, só 'limit'.
+    """
+    query = query.options(selectinload(Article.journal))
+
+    if not include_summary:
+        query = query.options(load_only(*ARTICLE_LIST_VIEW_COLUMNS))
+
+    if rank_column is not None:
+        if cursor:
+            raise ValueError("Cursor não é suportado na ordenação por relevância.")
+        query = query.order_by(rank_column, Article.published_at.desc(), Article.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all(), None
+
+    if cursor:
+        published_at, article_id = decode_article_cursor(cursor)
+        query = query.filter(or_(
+            Article.published_at < published_at,
+            and_(Article.published_at == published_at, Article.id < article_id)
+        ))
+
+    query = query.order_by(Article.published_at.desc(), Article.id.desc())
+
+    if limit is None:
+        return query.all(), None
+
+    # Busca uma linha a mais só para saber se existe próxima página.
+    articles = query.limit(limit + 1).all()
+    if len(articles) > limit:
+        articles = articles[:limit]
+        return articles, encode_article_cursor(articles[-1])
+    return articles, None
+
+
 def get_articles_with_filters(
     db: Session, 
     topics: Optional[List[str]] = None,
     sources: Optional[List[str]] = None,
     title_search: Optional[str] = None,
-    generic_news: Optional[bool] = None
-):
+    generic_news: Optional[bool] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_summary: bool = True,
+    sort_by_relevance: bool = False
+) -> Tuple[List[Article], Optional[str]]:
     
     query = db.query(Article) # Usa o 'db' recebido
+    rank_column = None
 
     if topics:
         query = query.filter(Article.topic.in_(topics))
     
     if sources:
-        query = query.filter(Article.source_name.in_(sources))
+        query = query.filter(Article.journal.has(Journal.name.in_(sources)))
     
     if title_search:
-        query = query.filter(func.lower(Article.title).like(f"%{title_search.lower()}%"))
+        search = search_articles_subquery(title_search)
+        if search is not None:
+            query = query.join(search, search.c.article_id == Article.id)
+            if sort_by_relevance:
+                rank_column = search.c.rank
         
     if generic_news is not None:
         query = query.filter(Article.generic_news == generic_news)
         
-    articles = query.order_by(Article.published_at.desc()).all()
-    
-    return articles
+    return paginate_articles(
+        query, limit=limit, cursor=cursor, include_summary=include_summary, rank_column=rank_column
+    )
+
+
+def get_user_articles(
+    db: Session,
+    user_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_summary: bool = True,
+    unread_only: bool = False,
+    journal_id: Optional[int] = None
+) -> Tuple[List[Article], Optional[str]]:
+    """Artigos dos journals em que o usuário está inscrito (ou de um deles)."""
+    subscribed = select(user_journal_association.c.journal_id).where(
+        user_journal_association.c.user_id == user_id
+    )
+    query = db.query(Article).filter(Article.journal_id.in_(subscribed))
+
+    if journal_id is not None:
+        query = query.filter(Article.journal_id == journal_id)
+
+    if unread_only:
+        query = query.filter(~exists().where(
+            UserArticleState.user_id == user_id,
+            UserArticleState.article_id == Article.id
+        ))
+
+    return paginate_articles(query, limit=limit, cursor=cursor, include_summary=include_summary)
+
+
+def get_user_article(db: Session, user_id: int, article_id: int) -> Optional[Article]:
+    """O artigo, se ele pertencer a um journal em que o usuário está inscrito."""
+    subscribed = select(user_journal_association.c.journal_id).where(
+        user_journal_association.c.user_id == user_id
+    )
+    return db.query(Article).filter(
+        Article.id == article_id,
+        Article.journal_id.in_(subscribed)
+    ).first()
+
+
+def get_user_profile(db: Session, user: User) -> dict:
+    """
+    Dados do perfil com agregados por journal (artigos, não lidos, último
+    artigo e última atualização), numa única consulta agrupada.
+    """
+    read_state = and_(
+        UserArticleState.article_id == Article.id,
+        UserArticleState.user_id == user.id
+    )
+    rows = db.execute(
+        select(
+            Journal.id, Journal.name, Journal.rss, Journal.url, Journal.last_refreshed_at,
+            func.count(Article.id).label("article_count"),
+            func.count(UserArticleState.article_id).label("read_count"),
+            func.max(Article.published_at).label("latest_article_at")
+        )
+        .select_from(user_journal_association)
+        .join(Journal, Journal.id == user_journal_association.c.journal_id)
+        .outerjoin(Article, Article.journal_id == Journal.id)
+        .outerjoin(UserArticleState, read_state)
+        .where(user_journal_association.c.user_id == user.id)
+        .group_by(Journal.id)
+        .order_by(Journal.name)
+    ).all()
+
+    journals = [
+        {
+            "id": row.id,
+            "name": row.name,
+            "rss": row.rss,
+            "url": row.url,
+            "article_count": row.article_count,
+            "unread_count": row.article_count - row.read_count,
+            "latest_article_at": row.latest_article_at,
+            "last_refreshed_at": row.last_refreshed_at,
+        }
+        for row in rows
+    ]
+    refreshed = [journal["last_refreshed_at"] for journal in journals if journal["last_refreshed_at"]]
+
+    return {
+        **{column.key: getattr(user, column.key) for column in User.__table__.columns},
+        "article_count": sum(journal["article_count"] for journal in journals),
+        "unread_count": sum(journal["unread_count"] for journal in journals),
+        "journal_count": len(journals),
+        "last_refreshed_at": max(refreshed, default=None),
+        "journals": journals,
+    }
+
+
+def get_change_cursor(db: Session) -> int:
+    """Posição atual do registro de mudanças (0 se ainda não há nenhuma)."""
+    return db.scalar(select(func.max(ArticleChange.id))) or 0
+
+
+def get_user_article_changes(db: Session, user_id: int, since: Optional[int], limit: int = 500) -> dict:
+    """
+    Mudanças na lista de artigos do usuário depois do cursor 'since':
+    artigos inseridos (já carregados) e ids de artigos apagados.
+
+    'reset' pede ao cliente para recarregar a lista inteira: acontece quando
+    o usuário mudou de inscrições ou quando o cursor é mais antigo que o
+    registro guardado. 'has_more' indica que há mais mudanças depois de 'cursor'.
+    """
+    head = get_change_cursor(db)
+    result = {"cursor": head, "inserted": [], "deleted": [], "reset": False, "has_more": False}
+
+    if since is None or since >= head:
+        return result
+
+    # prune_article_changes nunca apaga a última linha, então o menor id
+    # guardado marca até onde o registro foi podado.
+    oldest = db.scalar(select(func.min(ArticleChange.id)))
+    if oldest is not None and since < oldest - 1:
+        result["reset"] = True
+        return result
+
+    subscribed = select(user_journal_association.c.journal_id).where(
+        user_journal_association.c.user_id == user_id
+    )
+    changes = db.execute(
+        select(ArticleChange.id, ArticleChange.op, ArticleChange.article_id)
+        .where(
+            ArticleChange.id > since,
+            ArticleChange.id <= head,
+            or_(
+                and_(ArticleChange.user_id.is_(None), ArticleChange.journal_id.in_(subscribed)),
+                ArticleChange.user_id == user_id
+            )
+        )
+        .order_by(ArticleChange.id)
+        .limit(limit + 1)
+    ).all()
+
+    if len(changes) > limit:
+        changes = changes[:limit]
+        result["cursor"] = changes[-1].id
+        result["has_more"] = True
+
+    inserted_ids = set()
+    deleted_ids = set()
+    for change in changes:
+        if change.op in ("subscribe", "unsubscribe"):
+            result["reset"] = True
+            return result
+        if change.op == "insert":
+            inserted_ids.add(change.article_id)
+            deleted_ids.discard(change.article_id)
+        elif change.op == "delete":
+            inserted_ids.discard(change.article_id)
+            deleted_ids.add(change.article_id)
+
+    if inserted_ids:
+        result["inserted"] = (
+            db.query(Article)
+            .options(selectinload(Article.journal))
+            .filter(Article.id.in_(inserted_ids))
+            .order_by(Article.published_at.desc(), Article.id.desc())
+            .all()
+        )
+    result["deleted"] = sorted(deleted_ids)
+    return result
+
+
+def prune_article_changes(db: Session, keep_days: int) -> int:
+    """
+    Apaga o registro de mudanças mais antigo que 'keep_days'. A linha mais
+    recente sempre fica, para o cursor continuar verificável.
+    """
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=keep_days)
+    head = get_change_cursor(db)
+
+    result = db.execute(
+        delete(ArticleChange).where(
+            ArticleChange.changed_at < cutoff,
+            ArticleChange.id < head
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+def set_article_read(db: Session, user_id: int, article_id: int, read: bool = True):
+    state = db.get(UserArticleState, (user_id, article_id))
+
+    if read and state is None:
+        db.add(UserArticleState(
+            user_id=user_id, article_id=article_id, read_at=datetime.datetime.now()
+        ))
+    elif not read and state is not None:
+        db.delete(state)
+
+    db.commit()
         
     
-def save_articles_to_db(db: Session, articles: List[dict], journal_id: int, user_id: int, generic: bool = True) -> int:
+def get_existing_article_urls(db: Session, journal_id: int, urls: List[str]) -> set:
+    """Devolve, numa única consulta por lote, quais URLs o journal já tem salvas."""
+    urls = list({url for url in urls if url})
+    existing = set()
+
+    # Mantém o número de parâmetros abaixo do limite do SQLite.
+    for start in range(0, len(urls), 500):
+        chunk = urls[start:start + 500]
+        stmt = select(Article.url).where(
+            Article.journal_id == journal_id,
+            Article.url.in_(chunk)
+        )
+        existing.update(db.scalars(stmt))
+
+    return existing
+    
+def save_articles_to_db(db: Session, articles: List[dict], journal_id: int, generic: bool = True) -> int:
     if not articles:
         return 0
 
@@ -76,11 +436,13 @@ def save_articles_to_db(db: Session, articles: List[dict], journal_id: int, user
         published_at_str = article.get('publishedAt') 
         topic = article.get('topic') 
         img = article.get('image_url')
+        thumbnail = article.get('thumbnail_url')
         summary = article.get('summary', None)
         author = article.get('author', None)
 
         if not all([title, url, published_at_str]):
             print(f"  > Pulando artigo inválido (dados ausentes): {title}")
+            count_articles(journal_id, "skipped")
             continue
         
      
@@ -89,13 +451,13 @@ def save_articles_to_db(db: Session, articles: List[dict], journal_id: int, user
         article_data = {
             'title': title,
             'journal_id': journal_id,
-            'user_id': user_id, 
             'url': url,
             'published_at': published_at_brazil,
             'topic': topic,
             'downloaded_at': current_time,
             'generic_news': generic,
             'image_url': img,
+            'thumbnail_url': thumbnail,
             'summary': summary,
             'author': author
         }
@@ -107,34 +469,31 @@ def save_articles_to_db(db: Session, articles: List[dict], journal_id: int, user
 
     try:
 
-        stmt = sqlite_insert(Article).values(articles_to_insert)
-        stmt = stmt.on_conflict_do_nothing(index_elements=['url'])
+        stmt = dialect_insert(db, Article).values(articles_to_insert)
+        stmt = stmt.on_conflict_do_nothing(index_elements=['journal_id', 'url'])
         
-        result = db.execute(stmt)
-        db.commit() 
+        with observe_stage("db_insert"):
+            result = db.execute(stmt)
+            db.commit() 
         
         print(f"  > Salvos {result.rowcount} novos artigos.")
+        count_articles(journal_id, "saved", result.rowcount)
+        # O que o ON CONFLICT descartou já estava no banco.
+        count_articles(journal_id, "skipped", len(articles_to_insert) - result.rowcount)
         return result.rowcount 
         
     except Exception as e:
         print(f"  > [ERRO] Falha ao salvar artigos no banco: {e}")
         db.rollback() 
+        count_articles(journal_id, "failed", len(articles_to_insert))
         return 0 
 
 
 def delete_old_articles(days_old):
+    """Apaga os artigos com mais de 'days_old' dias, em lotes (core/retention.py)."""
     with SessionLocal() as session:
         try:
-            cutoff_date = datetime.datetime.now() - datetime.timedelta(days=days_old)
-            
-            stmt = delete(Article).where(Article.published_at < cutoff_date)
-            
-            result = session.execute(stmt)
-            
-            session.commit()
-            
-            print(f"\nLimpeza do banco de dados: Excluídos {result.rowcount} artigos mais antigos que {days_old} dias.")
-        
+            run_retention(session, default_days=days_old)
         except Exception as e:
             session.rollback()
             print(f"Erro de banco de dados durante a exclusão: {e}") 
@@ -145,9 +504,16 @@ def login(db: Session, email: str, password: str) -> Optional[User]:
     if not user:
         return None
     
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = verify_and_update_password(password, user.hashed_password)
+    if not verified:
         return None
 
+    # Parâmetros do argon2 mudaram desde o cadastro: aproveita a senha em
+    # texto puro deste login para regravar o hash.
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+
     return user
 
 def get_user_by_email(db: Session, email: str) -> Optional[User]: 
@@ -175,47 +541,79 @@ def create_db_user(db: Session, user_in: UserCreate) -> User:
 
     return db_user
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db) 
-):
+def _user_from_cache(db: Session, values: dict) -> User:
+    # Recria o usuário a partir das colunas guardadas e o anexa à sessão sem
+    # SELECT (load=False). Relacionamentos continuam lazy e vêm do banco.
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+def invalidate_cached_user(user_id: int):
+    """Descarta os tokens em cache do usuário; chamar depois de alterá-lo."""
+    principal_cache.invalidate_user(user_id)
+
+
+def _token_claims(token: str) -> dict:
     try:
-        user_decode = decode_access_token(token)
-        user_id = user_decode['id']
+        claims = decode_access_token(token)
+        claims['id']
+        return claims
     except Exception:
-         raise HTTPException(
+        raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido ou expirado",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
 
-    user = db.query(User).filter(User.id == user_id).first() 
-    
+
+def _remember_user(token: str, user: Optional[User], token_exp) -> User:
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuário não encontrado",
         )
-    
+
+    principal_cache.put(
+        token,
+        user.id,
+        {column.key: getattr(user, column.key) for column in User.__table__.columns},
+        token_exp=token_exp
+    )
     return user
 
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db) 
+):
+    cached = principal_cache.get(token)
+    if cached is not None:
+        return _user_from_cache(db, cached)
+
+    user_decode = _token_claims(token)
+    user = db.query(User).filter(User.id == user_decode['id']).first() 
+    return _remember_user(token, user, user_decode.get('exp'))
+
 def create_journal(
     db: Session,
     rss_url: str,
-    url: str
+    url: str,
+    feed_title: Optional[str] = None
 ):
-   
+    """
+    O journal do feed 'rss_url', criado se ainda não existir. 'feed_title'
+    vem de quem já validou o feed (a API assíncrona); sem ele o feed é
+    baixado e validado aqui.
+    """
     statement = select(Journal).where(Journal.rss == rss_url)
     journal_in_db = db.scalars(statement).first()
 
     if journal_in_db:
         return journal_in_db
 
-    try:
+    if feed_title is None:
         feed_title = validate_and_parse_feed(rss_url)
-    except ValueError as e:
-        raise e 
 
     new_journal = Journal(
         name=feed_title,
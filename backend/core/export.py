@@ -0,0 +1,206 @@
+# core/export.py
+"""
+Exportação do arquivo de artigos em streaming (NDJSON, Arrow e Parquet).
+
+As linhas vêm do banco por um cursor no servidor (yield_per), sem montar
+objetos do ORM nem schemas do Pydantic, e saem em blocos à medida que são
+lidas: a memória fica constante qualquer que seja o tamanho do arquivo.
+"""
+
+import datetime
+import json
+import os
+from typing import Iterator, List, Optional
+
+from sqlalchemy import select
+
+from core.database import SessionLocal
+from core.models import Article, Journal
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow é opcional: sem ele só o NDJSON fica disponível.
+    pa = None
+    pq = None
+
+# --- CONFIGURATION ---
+# Linhas buscadas do cursor por vez; também é o tamanho de cada record batch.
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+EXPORT_COLUMNS = [
+    Article.id, Article.title, Article.url, Article.published_at, Article.topic,
+    Article.author, Article.image_url, Article.thumbnail_url, Article.downloaded_at,
+    Article.generic_news, Article.journal_id, Journal.name.label("source")
+]
+
+
+def arrow_available() -> bool:
+    return pa is not None
+
+
+def _export_statement(
+    include_summary: bool,
+    topics: Optional[List[str]],
+    sources: Optional[List[str]],
+    generic_news: Optional[bool],
+    since: Optional[datetime.datetime]
+):
+    columns = list(EXPORT_COLUMNS)
+    if include_summary:
+        columns.insert(5, Article.summary)
+
+    stmt = select(*columns).join(Journal, Journal.id == Article.journal_id)
+
+    if topics:
+        stmt = stmt.where(Article.topic.in_(topics))
+    if sources:
+        stmt = stmt.where(Journal.name.in_(sources))
+    if generic_news is not None:
+        stmt = stmt.where(Article.generic_news == generic_news)
+    if since is not None:
+        stmt = stmt.where(Article.published_at >= since)
+
+    return stmt.order_by(Article.id)
+
+
+def _iter_row_chunks(stmt) -> Iterator[tuple[list, list]]:
+    """Blocos de (nomes das colunas, linhas) lidos do cursor no servidor."""
+    # A sessão é do próprio gerador: a resposta continua sendo enviada
+    # depois que a sessão da requisição (get_db) já foi fechada.
+    with SessionLocal() as db:
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        keys = list(result.keys())
+        for rows in result.partitions():
+            yield keys, rows
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _iter_ndjson(stmt) -> Iterator[bytes]:
+    for keys, rows in _iter_row_chunks(stmt):
+        yield "".join(
+            json.dumps(dict(zip(keys, row)), ensure_ascii=False, default=_json_default) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+class _ChunkSink:
+    """Arquivo só de escrita que acumula os bytes até o gerador drená-los."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_schema(include_summary: bool):
+    fields = [
+        pa.field("id", pa.int64()),
+        pa.field("title", pa.string()),
+        pa.field("url", pa.string()),
+        pa.field("published_at", pa.timestamp("us")),
+        pa.field("topic", pa.string()),
+        pa.field("author", pa.string()),
+        pa.field("image_url", pa.string()),
+        pa.field("thumbnail_url", pa.string()),
+        pa.field("downloaded_at", pa.timestamp("us")),
+        pa.field("generic_news", pa.bool_()),
+        pa.field("journal_id", pa.int64()),
+        pa.field("source", pa.dictionary(pa.int32(), pa.string())),
+    ]
+    if include_summary:
+        fields.insert(5, pa.field("summary", pa.string()))
+    return pa.schema(fields)
+
+
+def _record_batch(schema, rows: list):
+    columns = list(zip(*rows))
+    arrays = []
+    for field, column in zip(schema, columns):
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(column, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(column, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _iter_arrow(stmt, include_summary: bool, parquet: bool) -> Iterator[bytes]:
+    schema = _arrow_schema(include_summary)
+    sink = _ChunkSink()
+
+    if parquet:
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    try:
+        for _keys, rows in _iter_row_chunks(stmt):
+            batch = _record_batch(schema, rows)
+            if parquet:
+                writer.write_batch(batch, row_group_size=len(rows))
+            else:
+                writer.write_batch(batch)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def stream_articles_export(
+    export_format: str = "ndjson",
+    include_summary: bool = True,
+    topics: Optional[List[str]] = None,
+    sources: Optional[List[str]] = None,
+    generic_news: Optional[bool] = None,
+    since: Optional[datetime.datetime] = None
+) -> Iterator[bytes]:
+    """
+    Gerador com o arquivo exportado em blocos de bytes, em ordem de id.
+    Arrow e Parquet exigem o pyarrow; sem ele levanta ValueError.
+    """
+    if export_format not in EXPORT_MEDIA_TYPES:
+        raise ValueError(f"Formato de exportação inválido: {export_format}")
+    if export_format != "ndjson" and not arrow_available():
+        raise ValueError(f"Exportação em {export_format} requer o pacote 'pyarrow'.")
+
+    stmt = _export_statement(include_summary, topics, sources, generic_news, since)
+
+    if export_format == "ndjson":
+        return _iter_ndjson(stmt)
+    return _iter_arrow(stmt, include_summary, parquet=(export_format == "parquet"))
@@ -0,0 +1,148 @@
+# core/extraction_cache.py
+"""
+Cache em disco dos resultados da extração de páginas (texto principal e
+og:image), chaveado pela URL e pelo SHA-256 do HTML baixado. Uma página que
+volta igual (novo refresh, outro journal com o mesmo link, nova tentativa)
+não passa de novo pelo trafilatura; se o HTML mudou, o hash muda junto.
+
+Fica num arquivo SQLite próprio, separado do banco principal, e é limitado
+por tamanho: passando de EXTRACTION_CACHE_MAX_BYTES, as entradas usadas há
+mais tempo saem primeiro (LRU).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+# Caminho do arquivo do cache; vazio desliga o cache.
+EXTRACTION_CACHE_PATH = os.getenv("EXTRACTION_CACHE_PATH", "cache/extraction_cache.db")
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS extractions (
+    url TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    result TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (url, content_hash)
+);
+CREATE INDEX IF NOT EXISTS ix_extractions_last_used ON extractions (last_used);
+"""
+
+
+class ExtractionCache:
+    """Cache LRU em disco, seguro para os workers de extração do pipeline."""
+
+    def __init__(self, path: str = EXTRACTION_CACHE_PATH, max_bytes: int = EXTRACTION_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._connection = None
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path) and self.max_bytes > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Aberto só no primeiro uso, para importar o módulo não criar o arquivo.
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._total_bytes = connection.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+            self._connection = connection
+        return self._connection
+
+    def get(self, url: str, content_hash: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            try:
+                connection = self._connect()
+                row = connection.execute(
+                    "SELECT result FROM extractions WHERE url = ? AND content_hash = ?", (url, content_hash)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                connection.execute(
+                    "UPDATE extractions SET last_used = ? WHERE url = ? AND content_hash = ?",
+                    (time.time(), url, content_hash)
+                )
+                self.hits += 1
+                return json.loads(row[0])
+            except sqlite3.Error as e:
+                print(f"Erro ao ler o cache de extração: {e}")
+                return None
+
+    def put(self, url: str, content_hash: str, result: dict):
+        if not self.enabled:
+            return
+        payload = json.dumps(result, ensure_ascii=False)
+        size = len(payload.encode("utf-8")) + len(url)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            try:
+                connection = self._connect()
+                previous = connection.execute(
+                    "SELECT size FROM extractions WHERE url = ? AND content_hash = ?", (url, content_hash)
+                ).fetchone()
+                connection.execute(
+                    "INSERT OR REPLACE INTO extractions (url, content_hash, result, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (url, content_hash, payload, size, time.time())
+                )
+                self._total_bytes += size - (previous[0] if previous else 0)
+                if self._total_bytes > self.max_bytes:
+                    self._evict(connection)
+            except sqlite3.Error as e:
+                print(f"Erro ao gravar no cache de extração: {e}")
+
+    def _evict(self, connection: sqlite3.Connection):
+        # Libera até 90% do limite, para não despejar a cada inserção.
+        target = self.max_bytes * 0.9
+        while self._total_bytes > target:
+            rows = connection.execute(
+                "SELECT url, content_hash, size FROM extractions ORDER BY last_used LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            victims = []
+            for url, content_hash, size in rows:
+                victims.append((url, content_hash))
+                self._total_bytes -= size
+                if self._total_bytes <= target:
+                    break
+            connection.executemany(
+                "DELETE FROM extractions WHERE url = ? AND content_hash = ?", victims
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+extraction_cache = ExtractionCache()
@@ -0,0 +1,70 @@
+# core/feed_discovery.py
+"""
+Cache persistente da descoberta de feeds (site -> feed) usada por
+POST /api/journal. Um site já resolvido não é varrido de novo, e um site
+sem feed válido fica guardado como entrada negativa por um tempo menor, para
+que novas tentativas respondam na hora em vez de repetir a busca.
+"""
+
+import datetime
+import os
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from dotenv import load_dotenv
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from core.models import FeedDiscovery
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+# Validade de uma descoberta bem-sucedida e de uma negativa, em segundos.
+FEED_DISCOVERY_TTL_SECONDS = int(os.getenv("FEED_DISCOVERY_TTL_SECONDS", str(7 * 24 * 3600)))
+FEED_DISCOVERY_NEGATIVE_TTL_SECONDS = int(os.getenv("FEED_DISCOVERY_NEGATIVE_TTL_SECONDS", "3600"))
+
+
+def normalize_site_url(site_url: str) -> str:
+    """Chave do cache: esquema e host em minúsculas, sem barra final nem fragmento."""
+    parts = urlsplit(site_url.strip())
+    path = parts.path.rstrip('/')
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ''))
+
+
+def get_feed_discovery(db: Session, site_url: str) -> Optional[FeedDiscovery]:
+    """A descoberta em cache para o site, se ainda estiver válida."""
+    discovery = db.get(FeedDiscovery, normalize_site_url(site_url))
+    if discovery is None or discovery.expires_at <= datetime.datetime.now():
+        return None
+    return discovery
+
+
+def store_feed_discovery(db: Session, site_url: str, feed_url: Optional[str], error: Optional[str] = None) -> FeedDiscovery:
+    """Grava o resultado da descoberta; feed_url None grava uma entrada negativa."""
+    now = datetime.datetime.now()
+    ttl = FEED_DISCOVERY_TTL_SECONDS if feed_url else FEED_DISCOVERY_NEGATIVE_TTL_SECONDS
+
+    discovery = db.get(FeedDiscovery, normalize_site_url(site_url))
+    if discovery is None:
+        discovery = FeedDiscovery(site_url=normalize_site_url(site_url))
+        db.add(discovery)
+
+    discovery.feed_url = feed_url
+    discovery.error = None if feed_url else error
+    discovery.discovered_at = now
+    discovery.expires_at = now + datetime.timedelta(seconds=ttl)
+
+    try:
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Erro ao gravar a descoberta de feed de {site_url}: {e}")
+    return discovery
+
+
+def prune_feed_discoveries(db: Session) -> int:
+    """Apaga as descobertas vencidas. Devolve quantas foram apagadas."""
+    result = db.execute(delete(FeedDiscovery).where(FeedDiscovery.expires_at <= datetime.datetime.now()))
+    db.commit()
+    return result.rowcount
@@ -1,20 +1,25 @@
 
+import asyncio
 from datetime import datetime, timedelta, timezone
-import mimetypes
+import hashlib
 import os
-import ssl
-import uuid
 from dotenv import load_dotenv
 import feedparser
+import httpx
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from dateutil import parser
-from passlib.context import CryptContext
 from jose import jwt
 import feedfinder2
 import trafilatura
 
+from core.extraction_cache import extraction_cache
+from core.images import find_stored_image, store_image_response
+from core.passwords import password_pool
+from core.metrics import observe_stage
+from core.http_client import BROWSER_USER_AGENT, FEED_HEADERS, IMAGE_HEADERS, PAGE_HEADERS, async_http_get, http_get, http_head
+
 load_dotenv()
 
 
@@ -24,11 +29,7 @@ ALGORITHM = "HS256"
 
 def find_rss_feed(site_url):
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
-        }
-        
-        response = requests.get(site_url, headers=headers, timeout=10)
+        response = http_get(site_url, timeout=10)
         response.raise_for_status()
 
         soup = BeautifulSoup(response.text, 'html.parser')
@@ -65,7 +66,7 @@ def find_rss_feed(site_url):
         test_url = urljoin(site_url, path)
         
         try:
-            test_response = requests.head(test_url, headers=headers, timeout=5, allow_redirects=True)
+            test_response = http_head(test_url, timeout=5, allow_redirects=True)
             if test_response.status_code == 200:
                 print(f"get url from: {test_url}")
                 return test_url
@@ -85,16 +86,17 @@ def parse_datetime(date_string: str | None) -> datetime | None:
         print(f"error to parse date: {date_string}")
         return None
     
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
-
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica se a senha em texto puro corresponde à senha hashed."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_pool.verify(plain_password, hashed_password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Verifica a senha e devolve um hash novo se os parâmetros do argon2 mudaram."""
+    return password_pool.verify_and_update(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Gera o hash de uma senha em texto puro."""
-    pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
-    return pwd_context.hash(password)
+    return password_pool.hash(password)
 
 def create_access_token(data: dict):
     """
@@ -126,37 +128,111 @@ def decode_access_token(token: str) -> dict | None:
         print("Token inválido.")
         return None
     
-def validate_and_parse_feed(rss_url: str) -> str:  
+def fetch_feed(feed_url: str, etag: str | None = None, modified: str | None = None):
+    """
+    Baixa o feed pela sessão HTTP compartilhada, com GET condicional, e o
+    interpreta com o feedparser. Quando o servidor responde 304 o feed volta
+    com status 304 e sem entradas. 'etag' e 'modified' trazem os
+    validadores da resposta para a próxima leitura.
+    """
+    headers = dict(FEED_HEADERS)
+    if etag:
+        headers['If-None-Match'] = etag
+    if modified:
+        headers['If-Modified-Since'] = modified
+
+    with observe_stage("feed_download"):
+        response = http_get(feed_url, headers=headers)
+
+    if response.status_code == 304:
+        return feedparser.FeedParserDict(
+            status=304, entries=[], feed=feedparser.FeedParserDict(), bozo=False,
+            etag=etag, modified=modified
+        )
 
-    if hasattr(ssl, '_create_unverified_context'):
-        ssl._create_default_https_context = ssl._create_unverified_context
+    response.raise_for_status()
+    return _parse_feed_response(response.content, response.headers, str(response.url), response.status_code)
 
-    try:
-        feed = feedparser.parse(rss_url)
 
-        if feed.bozo:
-            raise ValueError(f"Jornal indisponível ou inválido: {rss_url}")
+def _parse_feed_response(content: bytes, headers, url: str, status_code: int):
+    # O content-location permite ao feedparser resolver links relativos.
+    response_headers = {key.lower(): value for key, value in headers.items()}
+    response_headers['content-location'] = url
+    with observe_stage("feed_parse"):
+        feed = feedparser.parse(content, response_headers=response_headers)
+
+    feed['status'] = status_code
+    feed['etag'] = headers.get('ETag')
+    feed['modified'] = headers.get('Last-Modified')
+    return feed
+
+
+async def fetch_feed_async(feed_url: str):
+    """fetch_feed pelo cliente HTTP assíncrono; o parse roda numa thread."""
+    with observe_stage("feed_download"):
+        response = await async_http_get(feed_url, headers=FEED_HEADERS)
+    response.raise_for_status()
+    return await asyncio.to_thread(
+        _parse_feed_response, response.content, response.headers, str(response.url), response.status_code
+    )
+
 
-        feed_title = feed.feed.get("title")
-        if not feed_title:
-            raise ValueError("Jornal indisponível ou inválido: {rss_url}")
+class FeedUnavailableError(ValueError):
+    """
+    O site ou o feed não respondeu (rede, timeout, 5xx, 429): a falha é
+    passageira e não diz nada sobre o site ter ou não um feed válido.
+    """
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        status_code = error.response.status_code
+        return status_code >= 500 or status_code == 429
+    return isinstance(error, (httpx.HTTPError, requests.exceptions.RequestException))
+
+
+def _feed_title(feed, rss_url: str) -> str:
+    if feed.bozo:
+        raise ValueError(f"Jornal indisponível ou inválido: {rss_url}")
 
-        return feed_title
+    feed_title = feed.feed.get("title")
+    if not feed_title:
+        raise ValueError("Jornal indisponível ou inválido: {rss_url}")
+
+    return feed_title
+
+    
+def validate_and_parse_feed(rss_url: str) -> str:  
+
+    try:
+        return _feed_title(fetch_feed(rss_url), rss_url)
 
     except Exception as e:
         if isinstance(e, ValueError):
             raise e
         
         raise ValueError(f"Jornal indisponível ou inválido: {rss_url}")
+
+
+async def validate_and_parse_feed_async(rss_url: str):
+    """
+    Valida o feed e devolve (título, feed). O feed já baixado e interpretado
+    serve para a primeira carga de artigos do journal, sem novo download.
+    """
+    try:
+        feed = await fetch_feed_async(rss_url)
+        return _feed_title(feed, rss_url), feed
+    except ValueError:
+        raise
+    except Exception as e:
+        if _is_transient(e):
+            raise FeedUnavailableError(f"Jornal indisponível no momento: {rss_url}")
+        raise ValueError(f"Jornal indisponível ou inválido: {rss_url}")
     
 
 def discover_rss_feed(website_url: str) -> str:
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
     try:
-        feeds = feedfinder2.find_feeds(website_url, user_agent=headers['User-Agent'])
+        feeds = feedfinder2.find_feeds(website_url, user_agent=BROWSER_USER_AGENT)
         
         if not feeds:
             sufixos = ['rss', 'feed']
@@ -164,7 +240,7 @@ def discover_rss_feed(website_url: str) -> str:
                 url_teste = urljoin(website_url if website_url.endswith('/') else website_url + '/', sufixo)
                 if url_teste not in feeds: 
                     try:
-                        resp = requests.get(url_teste, headers=headers, timeout=3) # HEAD é mais rápido que GET
+                        resp = http_get(url_teste, headers=FEED_HEADERS, timeout=3)
                         if resp.status_code == 200:
                             ct = resp.headers.get('Content-Type', '').lower()
                             if 'xml' in ct or 'rss' in ct:
@@ -177,52 +253,161 @@ def discover_rss_feed(website_url: str) -> str:
         return feeds[0]
         
     except requests.exceptions.RequestException as e:
-        raise ValueError(f"Erro de rede ao tentar acessar '{website_url}': {e}")
+        raise FeedUnavailableError(f"Erro de rede ao tentar acessar '{website_url}': {e}")
     
     
-def fetch_article_content_and_og_image(url):
+def _is_feed_content_type(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return 'xml' in content_type or 'rss' in content_type or 'atom' in content_type
 
-    content = None
-    og_image = None
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64; rv:137.0) Gecko/20100101 Firefox/137.0',
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-            "Sec-Fetch-Dest": "document",
-            "Sec-Fetch-Mode": "navigate",
-            "Sec-Fetch-Site": "none",
-            "Sec-Fetch-User": "?1",
-            "Cache-Control": "max-age=0",
-            "referer": "https://www.google.com"
-        }
-        response = requests.get(url, headers=headers, timeout=20) 
-        response.raise_for_status()
-        html_content = response.text
 
+def _feed_links(html: str, base_url: str) -> list[str]:
+    """Os <link rel="alternate"> de RSS/Atom da página, em URLs absolutas."""
+    soup = BeautifulSoup(html, 'html.parser')
+    links = []
+    for link in soup.find_all('link', rel='alternate', href=True):
+        if link.get('type') in ('application/rss+xml', 'application/atom+xml'):
+            links.append(urljoin(base_url, link['href']))
+    return links
 
-        content = trafilatura.extract(html_content, include_comments=False, include_tables=False)
 
-        # 2. Extract og:image using BeautifulSoup
-        soup = BeautifulSoup(html_content, 'lxml') # Use lxml ou html.parser
-        og_image_tag = soup.find('meta', property='og:image')
-        
-        if og_image_tag and og_image_tag.get('content'):
-            og_image = og_image_tag['content']
-            # Resolve URLs relativas (ex: /images/foo.jpg)
-            og_image = urljoin(url, og_image)
+async def discover_rss_feed_async(website_url: str) -> str:
+    """
+    discover_rss_feed sem bloquear o event loop: a página e os caminhos
+    comuns (/rss, /feed) são buscados pelo cliente assíncrono, e só quando
+    nada aparece o feedfinder2 (síncrono, mais completo) roda numa thread.
+    """
+    site_unavailable = False
+    try:
+        response = await async_http_get(website_url, headers=PAGE_HEADERS, timeout=10)
+        site_unavailable = response.status_code >= 500 or response.status_code == 429
+        if response.status_code == 200:
+            if _is_feed_content_type(response.headers.get('Content-Type', '')):
+                return str(response.url)
+            feeds = await asyncio.to_thread(_feed_links, response.text, str(response.url))
+            if feeds:
+                return feeds[0]
+    except httpx.HTTPError:
+        site_unavailable = True
+
+    base = website_url if website_url.endswith('/') else website_url + '/'
+    candidates = [urljoin(base, sufixo) for sufixo in ('rss', 'feed')]
+    responses = await asyncio.gather(
+        *(async_http_get(candidate, headers=FEED_HEADERS, timeout=3) for candidate in candidates),
+        return_exceptions=True
+    )
+    for candidate, resp in zip(candidates, responses):
+        if isinstance(resp, httpx.Response) and resp.status_code == 200 \
+                and _is_feed_content_type(resp.headers.get('Content-Type', '')):
+            return candidate
 
-        return {'content': content, 'og_image': og_image}
+    try:
+        return await asyncio.to_thread(discover_rss_feed, website_url)
+    except FeedUnavailableError:
+        raise
+    except ValueError as e:
+        # Sem resposta da página, "nenhum feed" não é um resultado confiável.
+        if site_unavailable:
+            raise FeedUnavailableError(str(e))
+        raise
 
+
+def fetch_article_html(url: str) -> bytes | None:
+    """
+    Etapa 1: baixa o HTML da página do artigo. Devolve os bytes crus: a
+    decodificação fica para o parser da extração, que detecta o charset.
+    """
+    try:
+        with observe_stage("article_fetch"):
+            response = http_get(url, headers=PAGE_HEADERS, timeout=20) 
+            response.raise_for_status()
+            return response.content
     except requests.exceptions.RequestException as e:
         print(f"Error fetching {url}: {e}")
-        return {'content': None, 'og_image': None}
+        return None
+
+
+def _find_og_image(tree, url: str) -> str | None:
+    for og_image in tree.xpath('//meta[@property="og:image"]/@content'):
+        og_image = og_image.strip()
+        if og_image:
+            # Resolve URLs relativas (ex: /images/foo.jpg)
+            return urljoin(url, og_image)
+    return None
+
+
+def extract_content_and_og_image(html_content: bytes | str, url: str) -> dict:
+    """
+    Etapa 2: extrai o texto principal e a og:image de um HTML já baixado.
+    O HTML é analisado uma única vez (a árvore do lxml serve às duas
+    buscas) e o resultado fica no cache de extração, chaveado pela URL e
+    pelo hash do conteúdo.
+    """
+    raw = html_content.encode('utf-8') if isinstance(html_content, str) else html_content
+    content_hash = hashlib.sha256(raw).hexdigest()
+
+    cached = extraction_cache.get(url, content_hash)
+    if cached is not None:
+        return cached
+
+    content = None
+    og_image = None
+    try:
+        with observe_stage("extraction"):
+            tree = trafilatura.load_html(raw)
+            if tree is not None:
+                # A og:image é lida antes: a extração limpa a árvore (sobre uma cópia).
+                og_image = _find_og_image(tree, url)
+                content = trafilatura.extract(tree, url=url, include_comments=False, include_tables=False)
     except Exception as e:
         print(f"Error processing content/og:image from {url}: {e}")
-        return {'content': content, 'og_image': None}
+        return {'content': content, 'og_image': og_image}
+
+    result = {'content': content, 'og_image': og_image}
+    extraction_cache.put(url, content_hash, result)
+    return result
+
+
+def is_downloadable_image_url(image_url: str | None) -> bool:
+    # Verifica se a URL é válida (começa com http) E não é None
+    return bool(image_url) and (
+        image_url.startswith('http://') or 
+        image_url.startswith('https://')
+    )
+
+
+def download_og_image(image_url: str, article_url: str) -> dict | None:
+    """
+    Etapa 3: baixa a og:image para o armazenamento de imagens e devolve os
+    caminhos públicos da imagem e da miniatura. Uma URL já baixada antes
+    (por qualquer usuário) é reaproveitada sem novo download.
+    """
+    stored = find_stored_image(image_url)
+    if stored is None:
+        try:
+            image_headers = {**IMAGE_HEADERS, 'Referer': article_url}
+            
+            with observe_stage("image_download"):
+                response = http_get(image_url, headers=image_headers, stream=True, timeout=10)
+                response.raise_for_status()
+
+                stored = store_image_response(response, image_url)
+
+        except requests.exceptions.RequestException as e:
+            print(f"Erro ao baixar imagem (requests): {image_url} - {e}")
+        except Exception as e:
+            print(f"Erro inesperado ao salvar imagem: {image_url} - {e}")
+
+    if stored is None:
+        return None
+    return {'image_path': stored.path, 'thumbnail_path': stored.thumbnail_path}
+
+
+def fetch_article_content_and_og_image(url):
+    html_content = fetch_article_html(url)
+    if html_content is None:
+        return {'content': None, 'og_image': None}
+    return extract_content_and_og_image(html_content, url)
     
     
 def processar_artigo_e_baixar_og_image(entry):
@@ -236,55 +421,11 @@ def processar_artigo_e_baixar_og_image(entry):
     article_content = dados_pagina['content']
     original_image_url = dados_pagina['og_image']
     
-    db_image_path = None
+    imagem = None
 
-    # 2. Lógica de Download (adaptada da nossa conversa anterior)
-    
-    # Verifica se a URL é válida (começa com http) E não é None
-    is_valid_download_url = original_image_url and (
-        original_image_url.startswith('http://') or 
-        original_image_url.startswith('https://')
-    )
-
-    if is_valid_download_url:
-        try:
-            # Headers simples, apenas para o download da imagem
-            image_headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36',
-                'Referer': article_url # Boa prática
-            }
-            
-            response = requests.get(original_image_url, headers=image_headers, stream=True, timeout=10)
-            response.raise_for_status()
-
-            content_type = response.headers.get('content-type')
-            ext = mimetypes.guess_extension(content_type)
-            if not ext or ext == '.jpe': 
-                ext = '.jpg'
-            elif content_type == 'image/svg+xml':
-                ext = '.svg'
-
-            filename = f"{uuid.uuid4()}{ext}"
-            SAVE_DIR = "static/articles_images"
-
-        
-            os.makedirs(SAVE_DIR, exist_ok=True)
-            
- 
-            save_path = os.path.join(SAVE_DIR, filename)
-            
-            with open(save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192): 
-                    f.write(chunk)
-            
-            db_image_path = f"/static/articles_images/{filename}" 
-            print(f"Sucesso! Imagem salva em: {save_path}")
-
-        except requests.exceptions.RequestException as e:
-            print(f"Erro ao baixar imagem (requests): {original_image_url} - {e}")
-        except Exception as e:
-            print(f"Erro inesperado ao salvar imagem: {original_image_url} - {e}")
-    
+    # 2. Lógica de Download
+    if is_downloadable_image_url(original_image_url):
+        imagem = download_og_image(original_image_url, article_url)
     elif original_image_url:
         print(f"Ignorando URL de imagem inválida ou 'data URI': {original_image_url[:70]}...")
     else:
@@ -293,5 +434,6 @@ def processar_artigo_e_baixar_og_image(entry):
     # 3. Retorna o dicionário final para seu script principal
     return {
         'content': article_content, 
-        'image_path': db_image_path
+        'image_path': imagem['image_path'] if imagem else None,
+        'thumbnail_path': imagem['thumbnail_path'] if imagem else None
     }
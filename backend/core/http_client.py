@@ -0,0 +1,222 @@
+# core/http_client.py
+
+import asyncio
+import os
+import threading
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+from core.metrics import HTTP_CLIENT_IN_FLIGHT
+from core.rate_limit import HostRateLimited, host_rate_limiter
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+# Timeouts (conexão, leitura) padrão de toda chamada de saída.
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "15"))
+# Quantos hosts mantêm um pool aberto e quantas conexões keep-alive cada um guarda.
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "64"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "8"))
+# Novas tentativas para falhas de conexão e respostas 429/5xx, com backoff
+# exponencial. O 429 passa pelo limite por host (core.rate_limit), que
+# bloqueia o host para todas as threads, não só para a requisição que o recebeu.
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+HTTP_VERIFY_TLS = os.getenv("HTTP_VERIFY_TLS", "1") not in ("0", "false", "False")
+
+BROWSER_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+DEFAULT_HEADERS = {
+    'User-Agent': BROWSER_USER_AGENT,
+    "Accept-Language": "pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.5",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+}
+
+PAGE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64; rv:137.0) Gecko/20100101 Firefox/137.0',
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Sec-Fetch-User": "?1",
+    "Cache-Control": "max-age=0",
+    "referer": "https://www.google.com"
+}
+
+FEED_HEADERS = {
+    "Accept": "application/rss+xml, application/atom+xml, application/xml;q=0.9, text/xml;q=0.8, */*;q=0.5",
+}
+
+IMAGE_HEADERS = {
+    "Accept": "image/avif,image/webp,image/png,image/jpeg,image/*;q=0.8,*/*;q=0.5",
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+_async_client = None
+_async_client_loop = None
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        read=HTTP_RETRIES,
+        status=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        # 429 e 503 ficam com _request, que respeita o Retry-After pelo
+        # limite por host; repeti-los aqui multiplicaria as tentativas.
+        status_forcelist=(500, 502, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.verify = HTTP_VERIFY_TLS
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Sessão HTTP compartilhada pelo processo inteiro. Mantém conexões
+    keep-alive por host, então feed, páginas e imagens de um mesmo
+    publicador reaproveitam o mesmo handshake TCP/TLS.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def _timeout(timeout):
+    if timeout is None:
+        return (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    if isinstance(timeout, (int, float)):
+        return (min(HTTP_CONNECT_TIMEOUT, timeout), timeout)
+    return timeout
+
+
+class HostRateLimitedError(requests.exceptions.RequestException):
+    """O host da URL está limitado por mais tempo do que vale esperar."""
+
+
+def _throttled(response) -> bool:
+    # 503 só conta quando o servidor diz quanto esperar.
+    return response.status_code == 429 or (
+        response.status_code == 503 and 'Retry-After' in response.headers
+    )
+
+
+def _request(method: str, url: str, **kwargs) -> requests.Response:
+    response = None
+    for attempt in range(HTTP_RETRIES + 1):
+        try:
+            host_rate_limiter.acquire(url)
+        except HostRateLimited as e:
+            # Bloqueio longo pedido pela resposta anterior: ela é o resultado.
+            if response is not None:
+                return response
+            raise HostRateLimitedError(str(e))
+
+        if response is not None:
+            response.close()
+        with HTTP_CLIENT_IN_FLIGHT.track_inprogress():
+            response = get_session().request(method, url, **kwargs)
+        if not _throttled(response):
+            return response
+
+        host_rate_limiter.penalize(url, response.headers.get('Retry-After'))
+    return response
+
+
+def http_get(url: str, *, headers: dict | None = None, timeout=None, **kwargs) -> requests.Response:
+    """GET pela sessão compartilhada, com limite por host, retry/backoff e timeouts padrão."""
+    return _request("GET", url, headers=headers, timeout=_timeout(timeout), **kwargs)
+
+
+def http_head(url: str, *, headers: dict | None = None, timeout=None, **kwargs) -> requests.Response:
+    """HEAD pela sessão compartilhada, com limite por host, retry/backoff e timeouts padrão."""
+    kwargs.setdefault("allow_redirects", False)
+    return _request("HEAD", url, headers=headers, timeout=_timeout(timeout), **kwargs)
+
+
+def _build_async_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        headers=DEFAULT_HEADERS,
+        verify=HTTP_VERIFY_TLS,
+        follow_redirects=True,
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_POOL_CONNECTIONS * HTTP_POOL_MAXSIZE,
+            max_keepalive_connections=HTTP_POOL_CONNECTIONS,
+        ),
+        # Só repete falhas de conexão; não há backoff para 429/5xx como no requests.
+        transport=httpx.AsyncHTTPTransport(retries=HTTP_RETRIES, verify=HTTP_VERIFY_TLS),
+    )
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Cliente HTTP assíncrono dos handlers async da API, com os mesmos
+    cabeçalhos e timeouts da sessão síncrona. Um por event loop, porque
+    as conexões do httpx ficam presas ao loop que as abriu.
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        _async_client = _build_async_client()
+        _async_client_loop = loop
+    return _async_client
+
+
+async def close_async_client():
+    global _async_client, _async_client_loop
+    if _async_client is not None and _async_client_loop is asyncio.get_running_loop():
+        await _async_client.aclose()
+    _async_client = None
+    _async_client_loop = None
+
+
+def _async_timeout(timeout) -> httpx.Timeout:
+    connect, read = _timeout(timeout)
+    return httpx.Timeout(read, connect=connect)
+
+
+async def async_http_get(url: str, *, headers: dict | None = None, timeout=None, **kwargs) -> httpx.Response:
+    """GET pelo cliente assíncrono compartilhado, com o limite por host e os timeouts padrão."""
+    response = None
+    for attempt in range(HTTP_RETRIES + 1):
+        try:
+            await host_rate_limiter.acquire_async(url)
+        except HostRateLimited as e:
+            # Bloqueio longo pedido pela resposta anterior: ela é o resultado.
+            if response is not None:
+                return response
+            raise httpx.TransportError(str(e))
+
+        with HTTP_CLIENT_IN_FLIGHT.track_inprogress():
+            response = await get_async_client().get(url, headers=headers, timeout=_async_timeout(timeout), **kwargs)
+        if not _throttled(response):
+            return response
+
+        host_rate_limiter.penalize(url, response.headers.get('Retry-After'))
+    return response
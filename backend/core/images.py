@@ -0,0 +1,256 @@
+# core/images.py
+
+import datetime
+import hashlib
+import mimetypes
+import os
+import time
+import uuid
+from typing import Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from core.engine import dialect_insert
+from core.models import Article, StoredImage, engine
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow é opcional: sem ele só não há miniaturas.
+    Image = None
+
+# --- CONFIGURATION ---
+IMAGE_STORE_DIR = "static/articles_images"
+IMAGE_PUBLIC_PREFIX = "/static/articles_images"
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))
+THUMBNAIL_WIDTH = int(os.getenv("THUMBNAIL_WIDTH", "480"))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+# Arquivos mais novos que isso nunca são coletados: podem pertencer a um
+# refresh em andamento cujos artigos ainda não foram salvos.
+IMAGE_GC_GRACE_SECONDS = int(os.getenv("IMAGE_GC_GRACE_SECONDS", "3600"))
+
+_ImageSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _public_path(relative_path: str) -> str:
+    return f"{IMAGE_PUBLIC_PREFIX}/{relative_path}"
+
+
+def _disk_path(public_path: str) -> str:
+    relative = public_path[len(IMAGE_PUBLIC_PREFIX):].lstrip("/")
+    return os.path.join(IMAGE_STORE_DIR, relative)
+
+
+def _extension_for(content_type: Optional[str]) -> str:
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type == 'image/svg+xml':
+        return '.svg'
+    ext = mimetypes.guess_extension(content_type) if content_type else None
+    if not ext or ext == '.jpe':
+        ext = '.jpg'
+    return ext
+
+
+def _make_thumbnail(original_path: str, digest: str) -> Optional[str]:
+    """Gera uma miniatura WebP com largura máxima THUMBNAIL_WIDTH."""
+    if Image is None or original_path.endswith('.svg'):
+        return None
+
+    relative = os.path.join(digest[:2], f"{digest}_w{THUMBNAIL_WIDTH}.webp")
+    thumb_path = os.path.join(IMAGE_STORE_DIR, relative)
+    if os.path.exists(thumb_path):
+        return _public_path(relative.replace(os.sep, "/"))
+
+    try:
+        with Image.open(original_path) as img:
+            img.thumbnail((THUMBNAIL_WIDTH, THUMBNAIL_WIDTH * 4))
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+            tmp_path = f"{thumb_path}.{uuid.uuid4().hex}.tmp"
+            img.save(tmp_path, "WEBP", quality=THUMBNAIL_QUALITY, method=4)
+        os.replace(tmp_path, thumb_path)
+        return _public_path(relative.replace(os.sep, "/"))
+    except Exception as e:
+        print(f"Erro ao gerar miniatura de {original_path}: {e}")
+        return None
+
+
+def find_stored_image(source_url: str) -> Optional[StoredImage]:
+    """Imagem já armazenada para esta URL de origem, se o arquivo ainda existir."""
+    with _ImageSession() as session:
+        stored = session.get(StoredImage, source_url)
+        if stored is None:
+            return None
+        try:
+            os.utime(_disk_path(stored.path))
+        except OSError:
+            return None
+        session.expunge(stored)
+        return stored
+
+
+def store_image_response(response, source_url: str) -> Optional[StoredImage]:
+    """
+    Grava o corpo de uma resposta HTTP no armazenamento endereçado por
+    conteúdo: o nome do arquivo é o SHA-256 dos bytes, então a mesma imagem
+    vinda de qualquer artigo, usuário ou URL é escrita uma única vez.
+    """
+    ext = _extension_for(response.headers.get('content-type'))
+    os.makedirs(IMAGE_STORE_DIR, exist_ok=True)
+    tmp_path = os.path.join(IMAGE_STORE_DIR, f".{uuid.uuid4().hex}.tmp")
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=8192):
+                size += len(chunk)
+                if size > IMAGE_MAX_BYTES:
+                    print(f"Imagem maior que {IMAGE_MAX_BYTES} bytes ignorada: {source_url}")
+                    return None
+                digest.update(chunk)
+                f.write(chunk)
+
+        hex_digest = digest.hexdigest()
+        relative = os.path.join(hex_digest[:2], f"{hex_digest}{ext}")
+        final_path = os.path.join(IMAGE_STORE_DIR, relative)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+
+        if os.path.exists(final_path):
+            # Renova o mtime para a coleta de órfãs não apagar o arquivo
+            # antes que o artigo que acabou de reusá-lo seja salvo.
+            os.utime(final_path)
+            print(f"Imagem já armazenada (dedup): {final_path}")
+        else:
+            os.replace(tmp_path, final_path)
+            print(f"Sucesso! Imagem salva em: {final_path}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    stored = StoredImage(
+        source_url=source_url,
+        sha256=hex_digest,
+        path=_public_path(relative.replace(os.sep, "/")),
+        thumbnail_path=_make_thumbnail(final_path, hex_digest),
+        size_bytes=size,
+        created_at=datetime.datetime.now()
+    )
+    _register(stored)
+    return stored
+
+
+def _register(stored: StoredImage):
+    values = {
+        column.key: getattr(stored, column.key)
+        for column in StoredImage.__table__.columns
+    }
+    stmt = dialect_insert(engine, StoredImage).values(values)
+    stmt = stmt.on_conflict_do_update(index_elements=['source_url'], set_=values)
+
+    with _ImageSession() as session:
+        try:
+            session.execute(stmt)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"Erro ao registrar imagem {stored.source_url}: {e}")
+
+
+def collect_orphan_images(db: Session, grace_seconds: int = IMAGE_GC_GRACE_SECONDS) -> int:
+    """
+    Remove do disco as imagens (e miniaturas) que nenhum artigo referencia
+    mais, e os registros de origem que apontavam para elas. As referências
+    são contadas a partir de articles.image_url/thumbnail_url.
+    Devolve quantos arquivos foram apagados.
+    """
+    if not os.path.isdir(IMAGE_STORE_DIR):
+        return 0
+
+    referenced = set()
+    for image_url, thumbnail_url in db.execute(
+        select(Article.image_url, Article.thumbnail_url).where(Article.image_url.is_not(None))
+    ):
+        referenced.add(image_url)
+        if thumbnail_url:
+            referenced.add(thumbnail_url)
+
+    cutoff = time.time() - grace_seconds
+    removed = set()
+
+    for root, _dirs, files in os.walk(IMAGE_STORE_DIR):
+        for filename in files:
+            disk_path = os.path.join(root, filename)
+            relative = os.path.relpath(disk_path, IMAGE_STORE_DIR).replace(os.sep, "/")
+            public_path = _public_path(relative)
+
+            if public_path in referenced:
+                continue
+            try:
+                if os.path.getmtime(disk_path) > cutoff:
+                    continue
+                os.remove(disk_path)
+                removed.add(public_path)
+            except OSError as e:
+                print(f"Erro ao remover imagem órfã {disk_path}: {e}")
+
+    removed = list(removed)
+    for start in range(0, len(removed), 500):
+        orphan_rows = db.scalars(
+            select(StoredImage).where(StoredImage.path.in_(removed[start:start + 500]))
+        ).all()
+        for stored in orphan_rows:
+            db.delete(stored)
+    if removed:
+        db.commit()
+
+    print(f"Limpeza de imagens: {len(removed)} arquivos órfãos removidos.")
+    return len(removed)
+
+
+def remove_unreferenced_images(db: Session, public_paths, grace_seconds: int = IMAGE_GC_GRACE_SECONDS) -> int:
+    """
+    Versão pontual de collect_orphan_images: das imagens em 'public_paths'
+    (as dos artigos que acabaram de ser apagados), remove as que nenhum
+    artigo restante referencia. Não varre o diretório inteiro.
+    Devolve quantos arquivos foram apagados.
+    """
+    candidates = {path for path in public_paths if path and path.startswith(IMAGE_PUBLIC_PREFIX)}
+    if not candidates:
+        return 0
+
+    cutoff = time.time() - grace_seconds
+    removed = 0
+    candidates = sorted(candidates)
+    for start in range(0, len(candidates), 500):
+        chunk = candidates[start:start + 500]
+        referenced = set()
+        for image_url, thumbnail_url in db.execute(
+            select(Article.image_url, Article.thumbnail_url).where(
+                or_(Article.image_url.in_(chunk), Article.thumbnail_url.in_(chunk))
+            )
+        ):
+            referenced.update((image_url, thumbnail_url))
+
+        orphans = []
+        for public_path in chunk:
+            if public_path in referenced:
+                continue
+            disk_path = _disk_path(public_path)
+            try:
+                if os.path.getmtime(disk_path) > cutoff:
+                    continue
+                os.remove(disk_path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Erro ao remover imagem órfã {disk_path}: {e}")
+                continue
+            orphans.append(public_path)
+
+        for stored in db.scalars(select(StoredImage).where(StoredImage.path.in_(orphans))):
+            db.delete(stored)
+
+    db.commit()
+    return removed
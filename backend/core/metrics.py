@@ -0,0 +1,135 @@
+# core/metrics.py
+"""
+Métricas do processo no formato do Prometheus, expostas em GET /metrics.
+
+Cobrem o caminho de ingestão etapa por etapa (download e parse do feed,
+download da página, extração, download da imagem e INSERT no banco), os
+artigos salvos/pulados/com falha por journal e os trabalhos em andamento
+(requisições da API, chamadas HTTP de saída e jobs em cada etapa do
+pipeline). Os contadores que já existiam em outros módulos (pool de hash de
+senha, cache de extração, limite por host) entram por um coletor que os lê
+na hora da coleta.
+
+As métricas ficam em memória, por processo: com vários workers do uvicorn
+cada um responde pelas suas. Com SCHEDULER_IN_PROCESS=0 a ingestão roda no
+processo do scheduler.py, que expõe as dele em http://<host>:METRICS_PORT/metrics
+(padrão 9100); o /metrics da API fica só com as requisições.
+"""
+
+import os
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, start_http_server
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from core.extraction_cache import extraction_cache
+from core.passwords import password_pool
+from core.rate_limit import host_rate_limiter
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+# Porta do /metrics do scheduler quando ele roda como processo próprio; 0 desliga.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+METRICS_ADDR = os.getenv("METRICS_ADDR", "0.0.0.0")
+
+registry = CollectorRegistry()
+
+# Da fração de segundo (parse, INSERT, extração em cache) até os timeouts de rede.
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30)
+
+REFRESH_STAGE_SECONDS = Histogram(
+    "myjournal_refresh_stage_seconds",
+    "Duração de cada etapa da ingestão de artigos.",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+    registry=registry,
+)
+REFRESH_STAGE_ERRORS = Counter(
+    "myjournal_refresh_stage_errors",
+    "Falhas em cada etapa da ingestão de artigos.",
+    ["stage"],
+    registry=registry,
+)
+ARTICLES_PROCESSED = Counter(
+    "myjournal_articles",
+    "Artigos por journal e resultado: saved (novo no banco), skipped (já existia ou inválido), failed (erro ao salvar).",
+    ["journal_id", "result"],
+    registry=registry,
+)
+API_REQUESTS_IN_FLIGHT = Gauge(
+    "myjournal_api_requests_in_flight",
+    "Requisições da API em andamento.",
+    registry=registry,
+)
+HTTP_CLIENT_IN_FLIGHT = Gauge(
+    "myjournal_http_client_requests_in_flight",
+    "Chamadas HTTP de saída em andamento (feeds, páginas, imagens).",
+    registry=registry,
+)
+PIPELINE_JOBS_IN_FLIGHT = Gauge(
+    "myjournal_pipeline_jobs_in_flight",
+    "Artigos sendo processados em cada etapa do pipeline de enriquecimento.",
+    ["stage"],
+    registry=registry,
+)
+
+for _stage in ("feed_download", "feed_parse", "article_fetch", "extraction", "image_download", "db_insert"):
+    REFRESH_STAGE_SECONDS.labels(_stage)
+    REFRESH_STAGE_ERRORS.labels(_stage)
+
+
+@contextmanager
+def observe_stage(stage: str):
+    """Mede o bloco na etapa 'stage'; uma exceção conta também como falha da etapa."""
+    with REFRESH_STAGE_SECONDS.labels(stage).time():
+        try:
+            yield
+        except Exception:
+            REFRESH_STAGE_ERRORS.labels(stage).inc()
+            raise
+
+
+def count_articles(journal_id, result: str, amount: int = 1):
+    if amount:
+        ARTICLES_PROCESSED.labels(str(journal_id), result).inc(amount)
+
+
+class _StatsCollector:
+    """Lê os stats() dos componentes que já contam os próprios números."""
+
+    def collect(self):
+        passwords = password_pool.stats()
+        yield GaugeMetricFamily("myjournal_password_hash_queued", "Hashes de senha esperando um worker.", value=passwords["queued"])
+        yield GaugeMetricFamily("myjournal_password_hash_running", "Hashes de senha em execução.", value=passwords["running"])
+        yield CounterMetricFamily("myjournal_password_hash_completed", "Hashes de senha concluídos.", value=passwords["completed"])
+        yield CounterMetricFamily("myjournal_password_hash_rejected", "Logins recusados com a fila de hash cheia.", value=passwords["rejected"])
+        yield CounterMetricFamily("myjournal_password_hash_wait_seconds", "Tempo total de espera na fila de hash.", value=passwords["wait_seconds_total"])
+        yield CounterMetricFamily("myjournal_password_hash_seconds", "Tempo total gasto calculando hashes.", value=passwords["hash_seconds_total"])
+
+        cache = extraction_cache.stats()
+        yield CounterMetricFamily("myjournal_extraction_cache_hits", "Acertos do cache de extração.", value=cache["hits"])
+        yield CounterMetricFamily("myjournal_extraction_cache_misses", "Faltas do cache de extração.", value=cache["misses"])
+        yield GaugeMetricFamily("myjournal_extraction_cache_bytes", "Tamanho do cache de extração.", value=cache["bytes"])
+
+        limiter = host_rate_limiter.stats()
+        yield GaugeMetricFamily("myjournal_http_client_blocked_hosts", "Hosts bloqueados por 429/Retry-After.", value=limiter["blocked_hosts"])
+        yield CounterMetricFamily("myjournal_http_client_throttled", "Chamadas de saída que esperaram pelo limite do host.", value=limiter["throttled"])
+        yield CounterMetricFamily("myjournal_http_client_throttle_wait_seconds", "Tempo total de espera pelo limite dos hosts.", value=limiter["wait_seconds"])
+        yield CounterMetricFamily("myjournal_http_client_rate_limited", "Respostas 429/503 com Retry-After recebidas.", value=limiter["penalties"])
+
+
+registry.register(_StatsCollector())
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Corpo e content type da resposta de /metrics."""
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int = METRICS_PORT, addr: str = METRICS_ADDR):
+    """Serve /metrics numa thread, para processos sem a API (scheduler.py)."""
+    if port:
+        start_http_server(port, addr=addr, registry=registry)
+        print(f"[metrics] Métricas em http://{addr}:{port}/metrics")
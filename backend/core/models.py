@@ -1,11 +1,13 @@
 import os
 from pathlib import Path
-from sqlalchemy import DateTime, ForeignKey, Table, create_engine, Column, Integer, String, Boolean, func
+from sqlalchemy import JSON, DateTime, ForeignKey, Index, Table, UniqueConstraint, Column, Integer, String, Boolean, func, text
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import relationship
 from dotenv import load_dotenv
 load_dotenv()
 
+from core.engine import build_engine
+
 Base = declarative_base()
 BASE_DIR = Path(__file__).resolve().parent 
 
@@ -13,10 +15,16 @@ BASE_DIR = Path(__file__).resolve().parent
 DB_FILENAME = os.getenv("DB_NAME") 
 
 
-DB_PATH = BASE_DIR / DB_FILENAME 
-
+# DATABASE_URL troca o banco (ex.: PostgreSQL); sem ela, o SQLite em DB_NAME.
+DATABASE_URL = os.getenv("DATABASE_URL")
 
-DATABASE_URL = f"sqlite:///{DB_PATH}"
+if DATABASE_URL:
+    DB_PATH = None
+elif DB_FILENAME:
+    DB_PATH = BASE_DIR / DB_FILENAME
+    DATABASE_URL = f"sqlite:///{DB_PATH}"
+else:
+    raise RuntimeError("Defina DB_NAME (SQLite) ou DATABASE_URL.")
 
 user_journal_association = Table('user_journal_association', Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
@@ -24,23 +32,40 @@ user_journal_association = Table('user_journal_association', Base.metadata,
 )
 
 class Article(Base):
+    """
+    Um artigo de um journal, guardado uma única vez e compartilhado por todos
+    os usuários inscritos nele. O estado por usuário fica em UserArticleState.
+    """
     __tablename__ = 'articles'
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String, nullable=False)
-    url = Column(String, nullable=False, unique=True)
+    url = Column(String, nullable=False)
     published_at = Column(DateTime, nullable=False)
     topic = Column(String, nullable=True)
     summary = Column(String, nullable=True)
     author = Column(String, nullable=True)
     image_url = Column(String, nullable=True)
+    thumbnail_url = Column(String, nullable=True)
     downloaded_at = Column(DateTime, nullable=False)
     generic_news = Column(Boolean)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    user = relationship("User", back_populates="articles")
     journal_id = Column(Integer, ForeignKey("journals.id"), nullable=False)
     journal = relationship("Journal", back_populates="articles")
 
+    __table_args__ = (
+        # Um artigo por URL dentro de cada journal; também cobre a checagem
+        # em lote "quais destas URLs o journal já tem".
+        UniqueConstraint('journal_id', 'url', name='uq_articles_journal_id_url'),
+    )
+
+# Índices das listagens de artigos, todas em (published_at desc, id desc):
+# o feed do usuário filtra por journal_id, o arquivo geral por tipo de
+# notícia e tópico, e a limpeza varre published_at por faixa.
+Index('ix_articles_journal_id_published_at', Article.journal_id, Article.published_at.desc(), Article.id.desc())
+Index('ix_articles_published_at', Article.published_at.desc(), Article.id.desc())
+Index('ix_articles_generic_news_published_at', Article.generic_news, Article.published_at.desc(), Article.id.desc())
+Index('ix_articles_topic_published_at', Article.topic, Article.published_at.desc(), Article.id.desc())
+
 class User(Base):
     __tablename__ = 'users'
 
@@ -54,7 +79,14 @@ class User(Base):
     is_active = Column(Boolean, default=True, nullable=False)
     is_admin = Column(Boolean, default=False, nullable=False)
     newsletter_opt_in = Column(Boolean, default=False, nullable=False)
-    articles = relationship("Article", back_populates="user")
+    # Artigos dos journals em que o usuário está inscrito (somente leitura).
+    articles = relationship(
+        "Article",
+        secondary=user_journal_association,
+        primaryjoin=lambda: User.id == user_journal_association.c.user_id,
+        secondaryjoin=lambda: Article.journal_id == user_journal_association.c.journal_id,
+        viewonly=True,
+    )
     journals = relationship("Journal",
                             secondary=user_journal_association,
                             back_populates="users")
@@ -67,6 +99,17 @@ class Journal(Base):
     name = Column(String, nullable=False, index=True)
     url = Column(String, nullable=False, index=True)
     rss = Column(String, unique=True, nullable=False) 
+    # Agenda do scheduler (scheduler.py). O intervalo encurta quando o feed
+    # traz artigos novos e alonga quando não traz, seguindo o ritmo do journal.
+    refresh_interval_seconds = Column(Integer, nullable=True)
+    next_refresh_at = Column(DateTime, nullable=True, index=True)
+    last_refreshed_at = Column(DateTime, nullable=True)
+    # Reserva de quem está lendo o feed agora (scheduler, job manual ou a
+    # carga inicial). Vencida, o journal pode ser pego de novo.
+    refresh_leased_until = Column(DateTime, nullable=True)
+    # Dias que os artigos do journal ficam no arquivo (core/retention.py).
+    # None segue ARTICLE_RETENTION_DAYS; 0 guarda para sempre.
+    retention_days = Column(Integer, nullable=True)
 
 
     users = relationship("User",
@@ -74,8 +117,245 @@ class Journal(Base):
                          back_populates="journals")
     
     articles = relationship("Article", back_populates="journal")
+
+
+class UserArticleState(Base):
+    """Marca de leitura de um artigo compartilhado, por usuário."""
+    __tablename__ = 'user_article_states'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    article_id = Column(Integer, ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True)
+    read_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+class StoredImage(Base):
+    """
+    Uma og:image baixada. O arquivo em disco é nomeado pelo SHA-256 do
+    conteúdo, então URLs diferentes com os mesmos bytes dividem o arquivo.
+    A linha é por URL de origem para evitar baixar de novo a mesma imagem.
+    """
+    __tablename__ = 'stored_images'
+
+    source_url = Column(String, primary_key=True)
+    sha256 = Column(String(64), nullable=False, index=True)
+    path = Column(String, nullable=False, index=True)
+    thumbnail_path = Column(String, nullable=True)
+    size_bytes = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+class FeedValidator(Base):
+    """
+    Validadores HTTP (ETag/Last-Modified) da última leitura bem-sucedida do
+    feed de um journal. Como os artigos são compartilhados por journal, um
+    304 vale para todos os inscritos.
+    """
+    __tablename__ = 'feed_validators'
+
+    journal_id = Column(Integer, ForeignKey('journals.id'), primary_key=True)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    checked_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+class FeedDiscovery(Base):
+    """
+    Cache da descoberta de feed por site (URL do site -> URL do feed). Sem
+    feed_url é uma entrada negativa: o site não tem feed válido, e 'error'
+    guarda o motivo. Vale até expires_at.
+    """
+    __tablename__ = 'feed_discoveries'
+
+    site_url = Column(String, primary_key=True)
+    feed_url = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    discovered_at = Column(DateTime, nullable=False, server_default=func.now())
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class RefreshJob(Base):
+    """
+    Pedido de atualização feito por um usuário. A API só grava o pedido e
+    devolve o id; o scheduler o executa em segundo plano.
+    """
+    __tablename__ = 'refresh_jobs'
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    # queued -> running -> done | error
+    status = Column(String(16), nullable=False, default='queued', index=True)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    # Renovado enquanto o job roda; parado há muito tempo, o processo morreu.
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    new_articles_found = Column(Integer, nullable=True)
+    details = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+
+    __table_args__ = (
+        # No máximo um job ativo por usuário, mesmo com dois pedidos
+        # simultâneos (veja enqueue_refresh).
+        Index(
+            'uq_refresh_jobs_active_user', 'user_id', unique=True,
+            sqlite_where=text("status IN ('queued', 'running')")
+        ),
+    )
+
+
+class ArticleChange(Base):
+    """
+    Registro das mudanças que afetam a lista de artigos de um usuário,
+    preenchido pelos triggers de ARTICLE_CHANGES_DDL. O id só cresce
+    (AUTOINCREMENT), então serve de cursor para a sincronização incremental.
+
+    op: 'insert'/'delete' de artigos, ou 'subscribe'/'unsubscribe' de um
+    usuário num journal (nesse caso user_id vem preenchido).
+    """
+    __tablename__ = 'article_changes'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    op = Column(String(16), nullable=False)
+    article_id = Column(Integer, nullable=True)
+    journal_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, nullable=True)
+    changed_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = {'sqlite_autoincrement': True}
     
-engine = create_engine(DATABASE_URL)
+engine = build_engine(DATABASE_URL)
+
+# Índice de busca textual (SQLite FTS5) sobre título e conteúdo dos artigos.
+# É uma tabela de "conteúdo externo": guarda só o índice e é mantida pelos
+# triggers abaixo, inclusive nas exclusões da retenção (core/retention.py).
+# 'remove_diacritics 2' deixa a busca insensível a acentos ("educacao" acha
+# "educação") e 'prefix' acelera as buscas por prefixo.
+ARTICLE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+        title, summary,
+        content='articles', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_fts_ai AFTER INSERT ON articles BEGIN
+        INSERT INTO articles_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_fts_ad AFTER DELETE ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, title, summary)
+        VALUES ('delete', old.id, old.title, old.summary);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_fts_au AFTER UPDATE OF title, summary ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, title, summary)
+        VALUES ('delete', old.id, old.title, old.summary);
+        INSERT INTO articles_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+    END
+    """,
+]
+
+# Triggers que alimentam article_changes. Ficam no banco para cobrir qualquer
+# caminho de escrita (save_articles_to_db, limpeza, inscrições).
+ARTICLE_CHANGES_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS article_changes_ai AFTER INSERT ON articles BEGIN
+        INSERT INTO article_changes(op, article_id, journal_id) VALUES ('insert', new.id, new.journal_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS article_changes_ad AFTER DELETE ON articles BEGIN
+        INSERT INTO article_changes(op, article_id, journal_id) VALUES ('delete', old.id, old.journal_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS article_changes_subscribe AFTER INSERT ON user_journal_association BEGIN
+        INSERT INTO article_changes(op, journal_id, user_id) VALUES ('subscribe', new.journal_id, new.user_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS article_changes_unsubscribe AFTER DELETE ON user_journal_association BEGIN
+        INSERT INTO article_changes(op, journal_id, user_id) VALUES ('unsubscribe', old.journal_id, old.user_id);
+    END
+    """,
+]
+
+# No PostgreSQL a busca usa um índice GIN sobre o tsvector de título e
+# conteúdo, e o log de mudanças é alimentado por uma função plpgsql.
+# Os ids vêm de uma sequence e podem ser confirmados fora de ordem em
+# transações concorrentes, então o cursor de mudanças é aproximado ali.
+ARTICLE_SEARCH_DDL_POSTGRES = [
+    """
+    CREATE INDEX IF NOT EXISTS ix_articles_search ON articles USING gin (
+        to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(summary, ''))
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_articles_search_title ON articles USING gin (
+        to_tsvector('simple', coalesce(title, ''))
+    )
+    """,
+]
+
+ARTICLE_CHANGES_DDL_POSTGRES = [
+    """
+    CREATE OR REPLACE FUNCTION article_changes_log() RETURNS trigger AS $$
+    BEGIN
+        IF TG_TABLE_NAME = 'articles' THEN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO article_changes(op, article_id, journal_id) VALUES ('insert', NEW.id, NEW.journal_id);
+            ELSE
+                INSERT INTO article_changes(op, article_id, journal_id) VALUES ('delete', OLD.id, OLD.journal_id);
+            END IF;
+        ELSIF TG_OP = 'INSERT' THEN
+            INSERT INTO article_changes(op, journal_id, user_id) VALUES ('subscribe', NEW.journal_id, NEW.user_id);
+        ELSE
+            INSERT INTO article_changes(op, journal_id, user_id) VALUES ('unsubscribe', OLD.journal_id, OLD.user_id);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER article_changes_articles AFTER INSERT OR DELETE ON articles
+    FOR EACH ROW EXECUTE FUNCTION article_changes_log()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER article_changes_subscriptions AFTER INSERT OR DELETE ON user_journal_association
+    FOR EACH ROW EXECUTE FUNCTION article_changes_log()
+    """,
+]
+
+def setup_search_index(bind=engine):
+    if bind.dialect.name == "postgresql":
+        with bind.begin() as connection:
+            for statement in ARTICLE_SEARCH_DDL_POSTGRES:
+                connection.exec_driver_sql(statement)
+        return
+
+    with bind.begin() as connection:
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'articles_fts'"
+        ).first()
+
+        for statement in ARTICLE_SEARCH_DDL:
+            connection.exec_driver_sql(statement)
+
+        # Bancos que já tinham artigos antes do índice existir.
+        if not exists:
+            connection.exec_driver_sql("INSERT INTO articles_fts(articles_fts) VALUES ('rebuild')")
+
+def setup_change_log(bind=engine):
+    statements = ARTICLE_CHANGES_DDL_POSTGRES if bind.dialect.name == "postgresql" else ARTICLE_CHANGES_DDL
+    with bind.begin() as connection:
+        for statement in statements:
+            connection.exec_driver_sql(statement)
 
 def setup_database_orm():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    setup_search_index()
+    setup_change_log()
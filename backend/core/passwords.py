@@ -0,0 +1,138 @@
+# core/passwords.py
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+from passlib.context import CryptContext
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+# Parâmetros do argon2. Os padrões são os que os hashes já gravados usam
+# (m=65536, t=3, p=4); ao mudar, o hash é refeito no próximo login do usuário.
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+# Quantos hashes rodam ao mesmo tempo (cada um usa ARGON2_MEMORY_COST de RAM),
+# quantos podem esperar na fila e por quanto tempo antes de desistir.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "8"))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "5"))
+
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
+
+
+class PasswordHasherBusy(Exception):
+    """O pool de hashing está cheio; o cliente deve tentar de novo depois."""
+
+
+class PasswordHasherPool:
+    """
+    Pool limitado só para o argon2. O hash é caro em CPU e memória, então
+    roda em poucas threads próprias (o argon2-cffi libera o GIL) e com uma
+    fila curta: numa rajada de logins o excedente recebe PasswordHasherBusy
+    na hora, em vez de ocupar o threadpool que também serve as leituras.
+    """
+
+    def __init__(
+        self,
+        context: CryptContext = pwd_context,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_queue: int = PASSWORD_HASH_MAX_QUEUE,
+        queue_timeout: float = PASSWORD_HASH_QUEUE_TIMEOUT
+    ):
+        self.context = context
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._lock = threading.Lock()
+
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+        self._hash_seconds_total = 0.0
+
+    def hash(self, password: str) -> str:
+        return self._run(self.context.hash, password)
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return self._run(self.context.verify, password, hashed_password)
+
+    def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Como verify, mas também devolve um hash novo quando os parâmetros mudaram."""
+        return self._run(self.context.verify_and_update, password, hashed_password)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "wait_seconds_total": self._wait_seconds_total,
+                "wait_seconds_max": self._wait_seconds_max,
+                "hash_seconds_total": self._hash_seconds_total,
+            }
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PasswordHasherBusy("Muitas requisições de login no momento.")
+
+        submitted = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+
+        def task():
+            started = time.perf_counter()
+            with self._lock:
+                wait = started - submitted
+                self._queued -= 1
+                self._running += 1
+                self._wait_seconds_total += wait
+                self._wait_seconds_max = max(self._wait_seconds_max, wait)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._hash_seconds_total += time.perf_counter() - started
+
+        try:
+            future = self._executor.submit(task)
+            try:
+                return future.result(timeout=self.queue_timeout)
+            except FutureTimeoutError:
+                # Só desiste se o hash ainda nem começou; se já está rodando, espera.
+                if future.cancel():
+                    with self._lock:
+                        self._queued -= 1
+                        self._timed_out += 1
+                    raise PasswordHasherBusy("Tempo de espera para validar a senha esgotado.")
+                return future.result()
+        finally:
+            self._slots.release()
+
+
+password_pool = PasswordHasherPool()
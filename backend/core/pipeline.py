@@ -0,0 +1,270 @@
+# core/pipeline.py
+
+import os
+import queue
+import threading
+from collections import OrderedDict, defaultdict, deque
+from typing import Callable, List, Optional
+from urllib.parse import urlsplit
+
+from core.metrics import PIPELINE_JOBS_IN_FLIGHT
+from core.helpers import (
+    download_og_image, extract_content_and_og_image,
+    fetch_article_html, is_downloadable_image_url
+)
+
+# Orçamento de concorrência de cada etapa do pipeline de enriquecimento.
+# O download das páginas é dominado por rede, a extração por CPU.
+PIPELINE_FETCH_WORKERS = int(os.getenv("PIPELINE_FETCH_WORKERS", "8"))
+PIPELINE_EXTRACT_WORKERS = int(os.getenv("PIPELINE_EXTRACT_WORKERS", "2"))
+PIPELINE_IMAGE_WORKERS = int(os.getenv("PIPELINE_IMAGE_WORKERS", "4"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "32"))
+# Quantos downloads simultâneos um mesmo host pode ocupar em cada etapa de rede.
+PIPELINE_MAX_PER_HOST = int(os.getenv("PIPELINE_MAX_PER_HOST", "2"))
+
+_STOP = object()
+
+
+class EnrichmentJob:
+    """Um artigo atravessando o pipeline, com os resultados de cada etapa."""
+
+    def __init__(self, article: dict):
+        self.article = article
+        self.url = article.get('url')
+        self.html: Optional[bytes] = None
+        self.content: Optional[str] = None
+        self.og_image: Optional[str] = None
+        self.image_path: Optional[str] = None
+        self.thumbnail_path: Optional[str] = None
+        self.done = threading.Event()
+
+    def host_for(self, stage_name: str) -> str:
+        target = self.og_image if stage_name == "image" else self.url
+        return (urlsplit(target or "").hostname or "").lower()
+
+
+class _FifoQueue(queue.Queue):
+    """Fila limitada simples, para etapas que não dependem de rede."""
+
+    def task_done(self, job=None):
+        super().task_done()
+
+
+class _HostFairQueue:
+    """
+    Fila limitada que entrega os jobs em rodízio entre os hosts e nunca
+    deixa um host ocupar mais que `per_host` workers ao mesmo tempo.
+    Assim um site lento não monopoliza todas as threads da etapa.
+    """
+
+    def __init__(self, stage_name: str, maxsize: int, per_host: int):
+        self.stage_name = stage_name
+        self.maxsize = max(1, maxsize)
+        self.per_host = max(1, per_host)
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()
+        self._in_flight = defaultdict(int)
+        self._size = 0
+
+    def _host(self, job) -> Optional[str]:
+        return None if job is _STOP else job.host_for(self.stage_name)
+
+    def put(self, job):
+        host = self._host(job)
+        with self._cond:
+            while job is not _STOP and self._size >= self.maxsize:
+                self._cond.wait()
+            self._pending.setdefault(host, deque()).append(job)
+            self._size += 1
+            self._cond.notify_all()
+
+    def get(self):
+        with self._cond:
+            while True:
+                for host, jobs in self._pending.items():
+                    if host is not None and self._in_flight[host] >= self.per_host:
+                        continue
+                    job = jobs.popleft()
+                    # Manda o host para o fim da fila de rodízio.
+                    del self._pending[host]
+                    if jobs:
+                        self._pending[host] = jobs
+                    if host is not None:
+                        self._in_flight[host] += 1
+                    self._size -= 1
+                    self._cond.notify_all()
+                    return job
+                self._cond.wait()
+
+    def task_done(self, job):
+        host = self._host(job)
+        if host is None:
+            return
+        with self._cond:
+            self._in_flight[host] -= 1
+            if not self._in_flight[host]:
+                del self._in_flight[host]
+            self._cond.notify_all()
+
+
+class _Stage:
+    """
+    Uma etapa do pipeline: uma fila limitada consumida por N threads.
+
+    O handler devolve True quando o job deve seguir para a próxima etapa;
+    caso contrário (ou na última etapa) o job é marcado como concluído.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[EnrichmentJob], bool],
+        workers: int,
+        queue_size: int,
+        next_stage: Optional["_Stage"] = None,
+        per_host: Optional[int] = None
+    ):
+        self.name = name
+        self.handler = handler
+        self.next_stage = next_stage
+        if per_host:
+            self.queue = _HostFairQueue(name, queue_size, per_host)
+        else:
+            self.queue = _FifoQueue(maxsize=max(1, queue_size))
+        self.threads = [
+            threading.Thread(target=self._run, name=f"pipeline-{name}-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def put(self, job):
+        # Bloqueia quando a fila está cheia: é o backpressure entre etapas.
+        self.queue.put(job)
+
+    def stop(self):
+        for _ in self.threads:
+            self.queue.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            if job is _STOP:
+                break
+
+            try:
+                with PIPELINE_JOBS_IN_FLIGHT.labels(self.name).track_inprogress():
+                    forward = self.handler(job)
+            except Exception as e:
+                print(f"  > [ERRO] Etapa '{self.name}' falhou para {job.url}: {e}")
+                forward = False
+            finally:
+                self.queue.task_done(job)
+
+            if forward and self.next_stage is not None:
+                self.next_stage.put(job)
+            else:
+                job.done.set()
+
+
+class ArticleEnrichmentPipeline:
+    """
+    Pipeline em etapas (baixar HTML -> extrair texto/og:image -> baixar imagem)
+    que substitui as chamadas em série a processar_artigo_e_baixar_og_image.
+
+    Cada etapa tem seu próprio número de threads e uma fila limitada, então
+    artigos de feeds diferentes avançam em paralelo. As etapas de rede limitam
+    quantos workers um mesmo host pode ocupar, então um site lento não trava
+    os downloads dos outros feeds.
+    """
+
+    def __init__(
+        self,
+        fetch_workers: int = PIPELINE_FETCH_WORKERS,
+        extract_workers: int = PIPELINE_EXTRACT_WORKERS,
+        image_workers: int = PIPELINE_IMAGE_WORKERS,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+        max_per_host: int = PIPELINE_MAX_PER_HOST
+    ):
+        image_stage = _Stage(
+            "image", self._download_image, image_workers, queue_size, per_host=max_per_host
+        )
+        extract_stage = _Stage("extract", self._extract, extract_workers, queue_size, image_stage)
+        fetch_stage = _Stage(
+            "fetch", self._fetch_html, fetch_workers, queue_size, extract_stage, per_host=max_per_host
+        )
+        self._stages = [fetch_stage, extract_stage, image_stage]
+        self._started = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        if not self._started:
+            for stage in self._stages:
+                stage.start()
+            self._started = True
+
+    def close(self):
+        # Para as etapas na ordem do fluxo para não descartar jobs em trânsito.
+        if self._started:
+            for stage in self._stages:
+                stage.stop()
+            self._started = False
+
+    def enrich(self, articles: List[dict]) -> List[dict]:
+        """
+        Envia os artigos ao pipeline e espera o lote terminar, preenchendo
+        'summary', 'image_url' e 'thumbnail_url'. Aceita chamadas de várias
+        threads ao mesmo tempo.
+        """
+        jobs = [EnrichmentJob(article) for article in articles if article.get('url')]
+
+        for job in jobs:
+            print(f"Buscando conteúdo/imagem de: {job.url}")
+            self._stages[0].put(job)
+
+        for job in jobs:
+            job.done.wait()
+            if job.content:
+                job.article['summary'] = job.content
+            job.article['image_url'] = job.image_path
+            job.article['thumbnail_url'] = job.thumbnail_path
+
+        return articles
+
+    @staticmethod
+    def _fetch_html(job: EnrichmentJob) -> bool:
+        job.html = fetch_article_html(job.url)
+        return job.html is not None
+
+    @staticmethod
+    def _extract(job: EnrichmentJob) -> bool:
+        dados_pagina = extract_content_and_og_image(job.html, job.url)
+        job.html = None
+        job.content = dados_pagina['content']
+        job.og_image = dados_pagina['og_image']
+
+        if is_downloadable_image_url(job.og_image):
+            return True
+        if job.og_image:
+            print(f"Ignorando URL de imagem inválida ou 'data URI': {job.og_image[:70]}...")
+        else:
+            print(f"Nenhuma og:image encontrada para: {job.url}")
+        return False
+
+    @staticmethod
+    def _download_image(job: EnrichmentJob) -> bool:
+        imagem = download_og_image(job.og_image, job.url)
+        if imagem:
+            job.image_path = imagem['image_path']
+            job.thumbnail_path = imagem['thumbnail_path']
+        return False
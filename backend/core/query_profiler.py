@@ -0,0 +1,145 @@
+# core/query_profiler.py
+"""
+Perfil das consultas SQL de cada requisição, para achar N+1 (relações
+carregadas uma a uma durante a serialização, SELECTs dentro de laços).
+
+Ligado por SQL_PROFILER=1. Os eventos before/after_cursor_execute dos
+engines (o síncrono e o que está por trás do assíncrono) somam, na
+requisição corrente, quantas consultas rodaram, o tempo no banco e as
+linhas lidas ou alteradas. A requisição corrente vem de uma ContextVar, que
+acompanha a requisição tanto no event loop (AsyncSession.run_sync) quanto
+nas threads dos handlers síncronos.
+
+A resposta sai com X-DB-Query-Count, X-DB-Time-ms e X-DB-Rows, e uma
+requisição com mais de SQL_PROFILER_QUERY_THRESHOLD consultas gera um aviso
+no log com a consulta que mais se repetiu. Em respostas em streaming os
+números cobrem só o que rodou até os cabeçalhos serem enviados.
+"""
+
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+SQL_PROFILER = os.getenv("SQL_PROFILER", "0") in ("1", "true", "True")
+# Acima de quantas consultas numa requisição o aviso é registrado.
+SQL_PROFILER_QUERY_THRESHOLD = int(os.getenv("SQL_PROFILER_QUERY_THRESHOLD", "20"))
+
+PROFILER_HEADERS = ["X-DB-Query-Count", "X-DB-Time-ms", "X-DB-Rows"]
+
+
+class QueryStats:
+    """Consultas de uma requisição."""
+
+    __slots__ = ("count", "seconds", "rows", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.statements = Counter()
+
+    def headers(self) -> dict:
+        return {
+            "X-DB-Query-Count": str(self.count),
+            "X-DB-Time-ms": f"{self.seconds * 1000:.1f}",
+            "X-DB-Rows": str(self.rows),
+        }
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+
+
+class _CountingCursor:
+    """Cursor DBAPI que soma às estatísticas as linhas que o SQLAlchemy busca."""
+
+    def __init__(self, cursor, stats: QueryStats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._stats.rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._stats.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._stats.rows += len(rows)
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.get("query_started_at")
+    if stats is None or not started:
+        return
+
+    stats.count += 1
+    stats.seconds += time.perf_counter() - started.pop()
+    stats.statements[statement] += 1
+
+    if cursor.description is None:
+        # INSERT/UPDATE/DELETE: as linhas afetadas.
+        stats.rows += max(cursor.rowcount, 0)
+    elif context is not None and not executemany:
+        # SELECT: conta as linhas quando o resultado é lido.
+        context.cursor = _CountingCursor(cursor, stats)
+
+
+def _handle_error(exception_context):
+    # A consulta falhou e não passa pelo after_cursor_execute.
+    started = exception_context.connection.info.get("query_started_at") if exception_context.connection else None
+    if _current.get() is not None and started:
+        started.pop()
+
+
+def instrument_engine(engine: Engine):
+    """Liga o perfil nos eventos de 'engine' (para AsyncEngine, passe engine.sync_engine)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def start_profiling() -> tuple[QueryStats, object]:
+    stats = QueryStats()
+    return stats, _current.set(stats)
+
+
+def stop_profiling(token):
+    _current.reset(token)
+
+
+def report(method: str, path: str, stats: QueryStats, threshold: int = SQL_PROFILER_QUERY_THRESHOLD):
+    if stats.count <= threshold:
+        return
+
+    statement, repeated = stats.statements.most_common(1)[0]
+    statement = " ".join(statement.split())
+    print(
+        f"[sql] {method} {path}: {stats.count} consultas (limite {threshold}), "
+        f"{stats.seconds * 1000:.1f} ms, {stats.rows} linhas. "
+        f"Mais repetida ({repeated}x): {statement[:300]}"
+    )
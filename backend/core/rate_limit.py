@@ -0,0 +1,205 @@
+# core/rate_limit.py
+"""
+Limite de taxa por host (token bucket) compartilhado por todas as chamadas
+de saída: feeds, páginas de artigos e imagens, na sessão síncrona e no
+cliente assíncrono. Cada host tem o seu balde, então hosts diferentes não
+esperam uns pelos outros e o tempo de um refresh fica limitado pelo host
+mais lento, não pela soma de pausas.
+
+Um 429 (ou 503 com Retry-After) bloqueia o host até o prazo pedido pelo
+servidor; quem pedir o host nesse meio tempo espera em vez de insistir.
+"""
+
+import asyncio
+import datetime
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+# Requisições por segundo e rajada máxima de cada host.
+HTTP_HOST_RATE = float(os.getenv("HTTP_HOST_RATE", "2"))
+HTTP_HOST_BURST = int(os.getenv("HTTP_HOST_BURST", "4"))
+# Taxas próprias de alguns hosts, no formato "host=taxa,host=taxa"; taxa 0
+# deixa o host sem limite.
+HTTP_HOST_RATES = os.getenv("HTTP_HOST_RATES", "")
+# Bloqueio aplicado a um 429 sem Retry-After, e o teto do Retry-After.
+HTTP_RETRY_AFTER_DEFAULT = float(os.getenv("HTTP_RETRY_AFTER_DEFAULT", "30"))
+HTTP_RETRY_AFTER_MAX = float(os.getenv("HTTP_RETRY_AFTER_MAX", "300"))
+# Espera máxima por um bloqueio de host (fora o intervalo de um token);
+# acima disso a requisição desiste na hora.
+HTTP_RATE_LIMIT_MAX_WAIT = float(os.getenv("HTTP_RATE_LIMIT_MAX_WAIT", "30"))
+
+
+class HostRateLimited(Exception):
+    """O host está bloqueado (ou congestionado) por mais que a espera máxima."""
+
+
+def _parse_host_rates(value: str) -> dict:
+    rates = {}
+    for item in value.split(","):
+        host, _, rate = item.partition("=")
+        if host.strip() and rate.strip():
+            rates[host.strip().lower()] = float(rate)
+    return rates
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Segundos de um Retry-After, que pode vir em segundos ou como data HTTP."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+def host_of(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+class _Bucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: int, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = now
+        self.blocked_until = 0.0
+
+
+class HostRateLimiter:
+    """Token bucket por hostname, seguro para threads e para o event loop."""
+
+    def __init__(
+        self,
+        rate: float = HTTP_HOST_RATE,
+        burst: int = HTTP_HOST_BURST,
+        host_rates: Optional[dict] = None,
+        max_wait: float = HTTP_RATE_LIMIT_MAX_WAIT
+    ):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.host_rates = _parse_host_rates(HTTP_HOST_RATES) if host_rates is None else host_rates
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self.requests = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self.penalties = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 or any(rate > 0 for rate in self.host_rates.values())
+
+    def _bucket(self, host: str, now: float) -> _Bucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate = self.host_rates.get(host, self.rate)
+            bucket = _Bucket(rate, self.burst, now)
+            self._buckets[host] = bucket
+        return bucket
+
+    def _reserve(self, url: str) -> float:
+        """Reserva um token do host e devolve quantos segundos esperar por ele."""
+        host = host_of(url)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(host, now)
+            if bucket.rate <= 0:
+                # Host sem limite de taxa: só o bloqueio de um 429 vale.
+                wait = max(0.0, bucket.blocked_until - now)
+            else:
+                # Durante um bloqueio o balde não enche (penalize adianta o
+                # 'updated'): ao fim dele o host recomeça devagar, sem rajada.
+                start = max(now, bucket.blocked_until)
+                if start > bucket.updated:
+                    bucket.tokens = min(bucket.capacity, bucket.tokens + (start - bucket.updated) * bucket.rate)
+                    bucket.updated = start
+
+                wait = start - now
+                if bucket.tokens < 1:
+                    wait += (1 - bucket.tokens) / bucket.rate
+
+            # Um bloqueio de max_wait (o 429 sem Retry-After, no padrão) ainda
+            # espera pelo primeiro token depois dele.
+            self.requests += 1
+            if wait > self.max_wait + (1 / bucket.rate if bucket.rate > 0 else 0.0):
+                self.rejected += 1
+                raise HostRateLimited(f"Host {host} limitado por mais {wait:.0f}s")
+
+            if bucket.rate > 0:
+                bucket.tokens -= 1
+            if wait > 0:
+                self.throttled += 1
+                self.wait_seconds += wait
+            return wait
+
+    def acquire(self, url: str) -> float:
+        """Espera (bloqueando a thread) a vez de chamar o host da URL."""
+        if not self.enabled:
+            return 0.0
+        wait = self._reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, url: str) -> float:
+        """acquire para o cliente assíncrono, sem bloquear o event loop."""
+        if not self.enabled:
+            return 0.0
+        wait = self._reserve(url)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def penalize(self, url: str, retry_after: Optional[str] = None) -> float:
+        """Bloqueia o host pelo Retry-After recebido. Devolve os segundos do bloqueio."""
+        seconds = parse_retry_after(retry_after)
+        if seconds is None:
+            seconds = HTTP_RETRY_AFTER_DEFAULT
+        seconds = min(seconds, HTTP_RETRY_AFTER_MAX)
+
+        host = host_of(url)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(host, now)
+            bucket.blocked_until = max(bucket.blocked_until, now + seconds)
+            bucket.tokens = min(bucket.tokens, 0.0)
+            bucket.updated = max(bucket.updated, bucket.blocked_until)
+            self.penalties += 1
+
+        print(f"Host {host} pediu para esperar; bloqueado por {seconds:.0f}s.")
+        return seconds
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "hosts": len(self._buckets),
+                "blocked_hosts": sum(1 for bucket in self._buckets.values() if bucket.blocked_until > now),
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "wait_seconds": self.wait_seconds,
+                "penalties": self.penalties,
+                "rejected": self.rejected,
+            }
+
+
+host_rate_limiter = HostRateLimiter()
@@ -0,0 +1,153 @@
+# core/retention.py
+"""
+Retenção do arquivo de artigos: apaga os artigos mais antigos que a
+política de cada journal em lotes pequenos, cada um na sua transação.
+
+Entre um lote e outro o banco fica livre para o refresh e para a API, e o
+tamanho do lote se ajusta para que cada transação segure o lock de escrita
+por no máximo RETENTION_BATCH_BUDGET_MS. Os candidatos saem do índice
+(journal_id, published_at); o DELETE é pela chave primária. Junto com os
+artigos saem as marcas de leitura e as imagens que ficaram sem referência;
+o índice de busca e o registro de mudanças são mantidos pelos triggers.
+"""
+
+import datetime
+import os
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from core.images import remove_unreferenced_images
+from core.models import Article, Journal, UserArticleState
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+# Dias que um artigo fica no arquivo quando o journal não tem política
+# própria (journals.retention_days). 0 desliga a retenção padrão.
+ARTICLE_RETENTION_DAYS = int(os.getenv("ARTICLE_RETENTION_DAYS", "0"))
+# Tamanho inicial e limites do lote, e o tempo máximo de lock por lote.
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+RETENTION_MIN_BATCH_SIZE = int(os.getenv("RETENTION_MIN_BATCH_SIZE", "50"))
+RETENTION_MAX_BATCH_SIZE = int(os.getenv("RETENTION_MAX_BATCH_SIZE", "5000"))
+RETENTION_BATCH_BUDGET_MS = float(os.getenv("RETENTION_BATCH_BUDGET_MS", "200"))
+# Pausa entre lotes, para os escritores que estavam esperando o lock.
+RETENTION_PAUSE_SECONDS = float(os.getenv("RETENTION_PAUSE_SECONDS", "0.05"))
+# Tempo máximo de uma execução; o que sobrar fica para a próxima.
+RETENTION_MAX_SECONDS = float(os.getenv("RETENTION_MAX_SECONDS", "60"))
+
+
+def retention_cutoffs(db: Session, default_days: int = ARTICLE_RETENTION_DAYS, now: Optional[datetime.datetime] = None) -> dict:
+    """Data de corte de cada journal com retenção ativa: {journal_id: cutoff}."""
+    now = now or datetime.datetime.now()
+    cutoffs = {}
+    for journal_id, retention_days in db.execute(select(Journal.id, Journal.retention_days)):
+        days = default_days if retention_days is None else retention_days
+        if days and days > 0:
+            cutoffs[journal_id] = now - datetime.timedelta(days=days)
+    return cutoffs
+
+
+def _delete_batch(db: Session, journal_id: int, cutoff: datetime.datetime, batch_size: int) -> tuple[int, set, float]:
+    """Um lote numa transação. Devolve (artigos apagados, imagens, segundos com o lock)."""
+    rows = db.execute(
+        select(Article.id, Article.image_url, Article.thumbnail_url)
+        .where(Article.journal_id == journal_id, Article.published_at < cutoff)
+        .order_by(Article.published_at, Article.id)
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        db.rollback()
+        return 0, set(), 0.0
+
+    ids = sorted(row.id for row in rows)
+    images = {url for row in rows for url in (row.image_url, row.thumbnail_url) if url}
+
+    # No SQLite o lock de escrita vai do primeiro DELETE até o commit.
+    locked = time.perf_counter()
+    db.execute(delete(UserArticleState).where(UserArticleState.article_id.in_(ids)))
+    result = db.execute(delete(Article).where(Article.id.in_(ids)))
+    db.commit()
+    return result.rowcount, images, time.perf_counter() - locked
+
+
+def run_retention(
+    db: Session,
+    default_days: int = ARTICLE_RETENTION_DAYS,
+    max_seconds: float = RETENTION_MAX_SECONDS
+) -> dict:
+    """
+    Aplica a política de retenção dentro de 'max_seconds'. Devolve um
+    relatório com artigos e imagens apagados, lotes, linhas/s e tempo de lock;
+    'complete' é False quando o tempo acabou antes de tudo ser apagado.
+    """
+    started = time.perf_counter()
+    report = {
+        "deleted": 0,
+        "images_removed": 0,
+        "batches": 0,
+        "journals": 0,
+        "seconds": 0.0,
+        "rows_per_second": 0.0,
+        "lock_seconds_total": 0.0,
+        "lock_seconds_max": 0.0,
+        "complete": True,
+    }
+
+    batch_size = RETENTION_BATCH_SIZE
+    budget = RETENTION_BATCH_BUDGET_MS / 1000
+    images = set()
+
+    for journal_id, cutoff in retention_cutoffs(db, default_days).items():
+        journal_deleted = 0
+        while True:
+            if time.perf_counter() - started >= max_seconds:
+                report["complete"] = False
+                break
+
+            size = batch_size
+            deleted, batch_images, lock_seconds = _delete_batch(db, journal_id, cutoff, size)
+            if not deleted:
+                break
+
+            journal_deleted += deleted
+            images |= batch_images
+            report["batches"] += 1
+            report["lock_seconds_total"] += lock_seconds
+            report["lock_seconds_max"] = max(report["lock_seconds_max"], lock_seconds)
+
+            # Lote mais lento que o orçamento encolhe; bem mais rápido, cresce.
+            if lock_seconds > budget:
+                batch_size = max(RETENTION_MIN_BATCH_SIZE, batch_size // 2)
+            elif lock_seconds < budget / 4:
+                batch_size = min(RETENTION_MAX_BATCH_SIZE, batch_size * 2)
+
+            if deleted < size:
+                break
+            time.sleep(RETENTION_PAUSE_SECONDS)
+
+        if journal_deleted:
+            report["journals"] += 1
+            report["deleted"] += journal_deleted
+        if not report["complete"]:
+            break
+
+    if images:
+        report["images_removed"] = remove_unreferenced_images(db, images)
+
+    report["seconds"] = time.perf_counter() - started
+    if report["seconds"] > 0:
+        report["rows_per_second"] = report["deleted"] / report["seconds"]
+
+    if report["deleted"]:
+        print(
+            f"Retenção: {report['deleted']} artigos de {report['journals']} journals apagados em "
+            f"{report['batches']} lotes ({report['rows_per_second']:.0f} linhas/s, lock total "
+            f"{report['lock_seconds_total'] * 1000:.0f} ms, máximo {report['lock_seconds_max'] * 1000:.0f} ms), "
+            f"{report['images_removed']} imagens removidas"
+            + ("" if report["complete"] else "; o restante fica para a próxima execução") + "."
+        )
+    return report
@@ -75,10 +75,10 @@ class ArticleSummary(BaseModel):
     author: Optional[str] = None
     summary:  Optional[str] = None
     image_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
     published_at: datetime
     topic: Optional[str] = None
     generic_news: bool
-    user_id: int
     model_config = ConfigDict(from_attributes=True)
 
 
@@ -109,6 +109,35 @@ class User(UserSummary):
     journals: List[JournalCreateResponse] = []
 
 
+class JournalStats(JournalCreateResponse):
+    """
+    Um journal seguido, com agregados calculados no banco.
+    Usado em 'UserProfile'.
+    """
+    article_count: int = 0
+    unread_count: int = 0
+    latest_article_at: Optional[datetime] = None
+    last_refreshed_at: Optional[datetime] = None
+
+
+class UserProfile(UserSummary):
+    """
+    Perfil leve do usuário: só contagens e agregados, nunca a lista de
+    artigos, então o tamanho da resposta não cresce com o histórico.
+    Usado em /api/users/me. Os artigos vêm paginados de /api/articles/me.
+    """
+    created_at: datetime
+    is_active: bool
+    is_admin: bool
+    newsletter_opt_in: bool = False
+
+    article_count: int = 0
+    unread_count: int = 0
+    journal_count: int = 0
+    last_refreshed_at: Optional[datetime] = None
+    journals: List[JournalStats] = []
+
+
 class Journal(BaseModel):
     """
     Schema completo para um Journal.
@@ -128,6 +157,29 @@ class Journal(BaseModel):
 
    
 
-class RefreshResponse(BaseModel):
-    refresh_details: dict
-    articles: List[Article]
\ No newline at end of file
+class ArticleChanges(BaseModel):
+    """
+    Mudanças na lista de artigos do usuário desde um cursor.
+    Usado em /api/articles/me/changes.
+    """
+    cursor: int
+    inserted: List[Article] = []
+    deleted: List[int] = []
+    reset: bool = False
+    has_more: bool = False
+
+
+class RefreshJob(BaseModel):
+    """
+    Estado de um pedido de atualização dos feeds.
+    Usado em POST /api/articles/me/refresh e no acompanhamento do job.
+    """
+    id: str
+    status: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    new_articles_found: Optional[int] = None
+    details: Optional[dict] = None
+    error: Optional[str] = None
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
@@ -1,20 +1,21 @@
-import mimetypes
 import os
-import sqlite3
-import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from bs4 import BeautifulSoup
 import requests
 import datetime
 import time
 from dotenv import load_dotenv
-import feedparser
 from email.utils import mktime_tz, parsedate_tz
 
-import urllib
+from urllib.parse import urlsplit
+from sqlalchemy.orm import Session
 
-from core.schemas import Article
-from core.helpers import  processar_artigo_e_baixar_og_image
-from core.database import SessionLocal, create_journal, delete_old_articles, save_articles_to_db
+from core.helpers import  fetch_feed, processar_artigo_e_baixar_og_image
+from core.http_client import http_get
+from core.metrics import count_articles
+from core.pipeline import ArticleEnrichmentPipeline
+from core.database import SessionLocal, get_existing_article_urls, save_articles_to_db
 from core import models 
 
 load_dotenv()
@@ -24,6 +25,10 @@ API_KEY = os.getenv("API_KEY")
 DB_NAME = "my_journal.db"
 NEWS_LIMIT_PER_TOPIC = 10
 DAYS_TO_KEEP_ARTICLES = 30
+# Quantos feeds são baixados em paralelo durante um refresh e quantos
+# deles podem bater no mesmo host ao mesmo tempo.
+REFRESH_MAX_WORKERS = int(os.getenv("REFRESH_MAX_WORKERS", "8"))
+REFRESH_MAX_PER_HOST = int(os.getenv("REFRESH_MAX_PER_HOST", "2"))
 
 
 
@@ -47,7 +52,7 @@ def fetch_news(api_key, query_value, limit, search_type='topic'):
         return []
 
     try:
-        response = requests.get(base_url, params=params)
+        response = http_get(base_url, params=params)
         response.raise_for_status() 
         data = response.json()
         
@@ -69,64 +74,85 @@ def format_rss_time_to_iso(time_string):
     except Exception:
         return datetime.datetime.now().isoformat()
 
-def fetch_news_from_rss(feed_url, limit, db, user_id):
-    try:
-        feed = feedparser.parse(feed_url)
-        articles_list = []
+def _new_feed_articles(feed, limit, db, journal_id) -> list[tuple]:
+    """
+    As entradas do feed que ainda não estão no banco, como pares
+    (entrada, artigo), com o artigo ainda sem o enriquecimento.
+    """
+    articles = []
+    entries = feed.entries[:limit]
+
+    # Uma consulta por feed em vez de um SELECT por entrada: só as
+    # entradas inéditas seguem para o enriquecimento.
+    seen_urls = get_existing_article_urls(
+        db, journal_id, [entry.get('link') for entry in entries]
+    )
+    
+    for entry in entries:
         
-        for entry in feed.entries[:limit]:
+        url = entry.get('link')
+        if(url):
+            if(url in seen_urls):
+                count_articles(journal_id, "skipped")
+                continue
+            seen_urls.add(url)
             
-            url = entry.get('link')
-            if(url):
-                exists = db.query(models.Article).filter(
-                    models.Article.url == url,
-                    models.Article.user_id == user_id
-                ).first()
-                if(exists):
-                    continue
-                
-                
-            published_time = entry.get('published', datetime.datetime.now().isoformat())
             
-            if not published_time.endswith('Z') and '+' not in published_time:
-                 published_time_iso = format_rss_time_to_iso(published_time)
-            else:
-                 published_time_iso = published_time
-                 
-            topic = None
-            if entry.get('tags'):
-                topic = entry.tags[0].get('term')
-                
-            author = entry.get('author', None)
+        published_time = entry.get('published', datetime.datetime.now().isoformat())
+        
+        if not published_time.endswith('Z') and '+' not in published_time:
+             published_time_iso = format_rss_time_to_iso(published_time)
+        else:
+             published_time_iso = published_time
+             
+        topic = None
+        if entry.get('tags'):
+            topic = entry.tags[0].get('term')
             
-            summary_text = None
+        author = entry.get('author', None)
+        
+        summary_text = None
 
-            summary_html = entry.get('summary', entry.get('description', ''))
-            
-            if summary_html:
-                soup = BeautifulSoup(summary_html, 'html.parser')
-                summary_text = soup.get_text(separator=" ", strip=True)
-                
+        summary_html = entry.get('summary', entry.get('description', ''))
+        
+        if summary_html:
+            soup = BeautifulSoup(summary_html, 'html.parser')
+            summary_text = soup.get_text(separator=" ", strip=True)
             
-            dados_artigo = processar_artigo_e_baixar_og_image(entry)
+        
+        article = {
+            'title': entry.get('title'),
+            'source': {'name': feed.feed.get('title', 'RSS Source')},
+            'url': url,
+            'publishedAt': published_time_iso,
+            'topic': topic,      
+            'image_url': None,
+            'thumbnail_url': None,
+            'summary': summary_text,
+            'author': author   
+        }
+        articles.append((entry, article))
 
+    return articles
 
-            db_image_url = dados_artigo['image_path']    
-            article_content = dados_artigo['content']
 
-    
+def fetch_news_from_rss(feed_url, limit, db, journal_id, pipeline: ArticleEnrichmentPipeline | None = None, feed=None):
+    try:
+        if feed is None:
+            feed = fetch_feed(feed_url)
+        new_articles = _new_feed_articles(feed, limit, db, journal_id)
+        articles_list = [article for _, article in new_articles]
 
-            article = {
-                'title': entry.get('title'),
-                'source': {'name': feed.feed.get('title', 'RSS Source')},
-                'url': url,
-                'publishedAt': published_time_iso,
-                'topic': topic,      
-                'image_url': db_image_url,
-                'summary': article_content or summary_text,
-                'author': author   
-            }
-            articles_list.append(article)
+        if pipeline is None:
+            for entry, article in new_articles:
+                dados_artigo = processar_artigo_e_baixar_og_image(entry)
+                article['image_url'] = dados_artigo['image_path']
+                article['thumbnail_url'] = dados_artigo['thumbnail_path']
+                article['summary'] = dados_artigo['content'] or article['summary']
+        else:
+            # Com o pipeline, as páginas de todas as entradas são baixadas e
+            # processadas em paralelo, junto com as dos outros feeds.
+            pipeline.enrich(articles_list)
             
         return articles_list
         
@@ -137,49 +163,226 @@ def fetch_news_from_rss(feed_url, limit, db, user_id):
 
 
 
-def update_feeds_for_user(db: requests.Session, user: models.User):
+class HostConcurrencyLimiter:
+    """Limita quantas requisições simultâneas cada host recebe."""
+
+    def __init__(self, max_per_host: int):
+        self.max_per_host = max(1, max_per_host)
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def for_url(self, url: str) -> threading.BoundedSemaphore:
+        host = (urlsplit(url).hostname or "").lower()
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_per_host)
+                self._semaphores[host] = semaphore
+        return semaphore
+
+
+def _fetch_journal_articles(
+    rss_url: str,
+    journal_id: int,
+    limiter: HostConcurrencyLimiter,
+    pipeline: ArticleEnrichmentPipeline,
+    validator: dict
+):
+    # Roda numa thread do pool: usa uma sessão própria, pois a Session
+    # do SQLAlchemy não pode ser compartilhada entre threads.
+    started = time.perf_counter()
+    result = {"articles": [], "not_modified": False, "etag": None, "modified": None}
+
+    # O limite por host vale só para o download do feed; as páginas dos
+    # artigos já têm o limite por host do pipeline.
+    with limiter.for_url(rss_url):
+        feed = fetch_feed(rss_url, etag=validator.get("etag"), modified=validator.get("modified"))
+
+    if getattr(feed, "status", None) == 304:
+        result["not_modified"] = True
+    else:
+        result["etag"] = feed.get("etag")
+        result["modified"] = feed.get("modified")
+        # A sessão só dura a consulta de duplicados: nenhuma conexão fica
+        # presa enquanto as páginas são baixadas.
+        with SessionLocal() as session:
+            new_articles = _new_feed_articles(feed, NEWS_LIMIT_PER_TOPIC, session, journal_id)
+        result["articles"] = pipeline.enrich([article for _, article in new_articles])
+
+    result["fetch_seconds"] = time.perf_counter() - started
+    return result
+
+
+def _store_feed_validator(db: Session, journal_id: int, etag, modified):
+    if not etag and not modified:
+        return
+
+    validator = db.get(models.FeedValidator, journal_id)
+    if validator is None:
+        validator = models.FeedValidator(journal_id=journal_id)
+        db.add(validator)
+
+    validator.etag = etag
+    validator.last_modified = modified
+    validator.checked_at = datetime.datetime.now()
+
+    try:
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"  > [ERRO] Falha ao salvar ETag/Last-Modified do journal {journal_id}: {e}")
+
+
+def seed_journal_from_feed(db: Session, journal: models.Journal, feed) -> dict:
+    """
+    Primeira carga de artigos de um journal recém-criado a partir do feed
+    que a API já baixou para validá-lo, sem baixá-lo de novo. Devolve o
+    resultado no mesmo formato de cada journal em refresh_journals.
+    """
+    timing = {
+        "journal_id": journal.id,
+        "name": journal.name,
+        "status": "ok",
+        "new_articles": 0,
+        "fetch_seconds": 0.0,
+        "save_seconds": 0.0,
+    }
+
+    print(f"\n- Carga inicial do Journal: '{journal.name}' (ID: {journal.id})")
+
+    started = time.perf_counter()
+    with ArticleEnrichmentPipeline() as pipeline:
+        articles = fetch_news_from_rss(journal.rss, NEWS_LIMIT_PER_TOPIC, db, journal.id, pipeline, feed=feed)
+    timing["fetch_seconds"] = round(time.perf_counter() - started, 3)
+
+    if not articles:
+        print("  > Nenhum artigo encontrado.")
+        timing["status"] = "empty"
+        _store_feed_validator(db, journal.id, feed.get("etag"), feed.get("modified"))
+        return timing
+
+    save_started = time.perf_counter()
+    num_saved = save_articles_to_db(db=db, articles=articles, journal_id=journal.id, generic=False)
+    timing["save_seconds"] = round(time.perf_counter() - save_started, 3)
+
+    print(f"  > {num_saved} artigos salvos.")
+    timing["new_articles"] = num_saved or 0
+    if num_saved:
+        _store_feed_validator(db, journal.id, feed.get("etag"), feed.get("modified"))
+    return timing
+
+
+def refresh_journals(db: Session, journals: list[models.Journal]) -> dict:
+    """
+    Atualiza os feeds dos journals em paralelo. Como os artigos são
+    compartilhados por journal, cada feed é baixado e enriquecido uma vez,
+    não importa quantos usuários estejam inscritos nele.
+    """
     total_articles_saved = 0
-    
+    journal_timings = []
+    refresh_started = time.perf_counter()
 
-    for journal in user.journals:
-        if not journal.rss:
-            continue
+    journals = [journal for journal in journals if journal.rss]
+    limiter = HostConcurrencyLimiter(REFRESH_MAX_PER_HOST)
+    max_workers = max(1, min(REFRESH_MAX_WORKERS, len(journals)))
 
-        print(f"\n- Processando Journal: '{journal.name}' (ID: {journal.id})")
-     
-        
-        articles = fetch_news_from_rss(journal.rss, NEWS_LIMIT_PER_TOPIC, db, user.id)
-        
-        if not articles:
-            print("  > Nenhum artigo novo encontrado.")
-            continue
-        
-        try:
-            num_saved = save_articles_to_db(
-                db=db,
-                articles=articles,  
-                journal_id=journal.id, 
-                generic=False,
-                user_id=user.id 
-            )
-            
-            
-            if num_saved is None:
-                num_saved = len(articles) 
+    validators = {
+        validator.journal_id: {"etag": validator.etag, "modified": validator.last_modified}
+        for validator in db.query(models.FeedValidator).filter(
+            models.FeedValidator.journal_id.in_([journal.id for journal in journals])
+        )
+    }
+
+    with ArticleEnrichmentPipeline() as pipeline, \
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="feed-refresh") as executor:
+        futures = {
+            executor.submit(
+                _fetch_journal_articles, journal.rss, journal.id, limiter, pipeline,
+                validators.get(journal.id, {})
+            ): journal
+            for journal in journals
+        }
+
+        # Os artigos são salvos na thread de quem chamou, à medida que cada
+        # feed termina, usando a sessão recebida.
+        for future in as_completed(futures):
+            journal = futures[future]
+            timing = {
+                "journal_id": journal.id,
+                "name": journal.name,
+                "status": "ok",
+                "new_articles": 0,
+                "fetch_seconds": None,
+                "save_seconds": 0.0,
+            }
+            journal_timings.append(timing)
+
+            print(f"\n- Processando Journal: '{journal.name}' (ID: {journal.id})")
+
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"  > [ERRO] Falha ao buscar o feed do journal {journal.id}: {e}")
+                timing["status"] = "error"
+                continue
+
+            timing["fetch_seconds"] = round(result["fetch_seconds"], 3)
+            articles = result["articles"]
+
+            if result["not_modified"]:
+                print("  > Feed não modificado (304), pulando.")
+                timing["status"] = "not_modified"
+                continue
+
+            if not articles:
+                print("  > Nenhum artigo novo encontrado.")
+                timing["status"] = "empty"
+                _store_feed_validator(db, journal.id, result["etag"], result["modified"])
+                continue
+
+            save_started = time.perf_counter()
+            try:
+                num_saved = save_articles_to_db(
+                    db=db,
+                    articles=articles,  
+                    journal_id=journal.id, 
+                    generic=False
+                )
                 
-            print(f"  > {num_saved} novos artigos salvos.")
-            total_articles_saved += num_saved
-        
-        except Exception as e:
-            print(f"  > [ERRO] Falha ao salvar artigos para o journal {journal.id}: {e}")
+                
+                if num_saved is None:
+                    num_saved = len(articles) 
+                    
+                print(f"  > {num_saved} novos artigos salvos.")
+                total_articles_saved += num_saved
+                timing["new_articles"] = num_saved
+
+                # save_articles_to_db devolve 0 também quando falha; nesse caso
+                # os validadores não são gravados para o feed ser lido de novo.
+                if num_saved:
+                    _store_feed_validator(db, journal.id, result["etag"], result["modified"])
             
-        
-        time.sleep(1)
+            except Exception as e:
+                print(f"  > [ERRO] Falha ao salvar artigos para o journal {journal.id}: {e}")
+                timing["status"] = "error"
+
+            timing["save_seconds"] = round(time.perf_counter() - save_started, 3)
 
-    print(f"\nAtualização concluída. Total de {total_articles_saved} novos artigos salvos.")
+    elapsed = time.perf_counter() - refresh_started
+    print(f"\nAtualização concluída em {elapsed:.1f}s. Total de {total_articles_saved} novos artigos salvos.")
     
+    return {
+        "new_articles_found": total_articles_saved,
+        "elapsed_seconds": round(elapsed, 3),
+        "journals": journal_timings
+    }
+
+
+def update_feeds_for_user(db: Session, user: models.User):
+    refresh_result = refresh_journals(db, user.journals)
+
     return {
         "status": "success", 
         "user_id": user.id, 
-        "new_articles_found": total_articles_saved
-    }
\ No newline at end of file
+        **refresh_result
+    }
@@ -0,0 +1,514 @@
+# scheduler.py
+"""
+Atualiza os feeds em segundo plano, fora do caminho das requisições.
+
+Cada journal tem o seu próprio intervalo de atualização, que se adapta ao
+ritmo de publicação do feed. Os pedidos manuais dos usuários viram linhas em
+refresh_jobs e são executados aqui; a API só devolve o id do job.
+
+Roda dentro da API (SCHEDULER_IN_PROCESS=1, o padrão) ou como processo
+separado, ao lado de journal.py:
+
+    python scheduler.py
+
+Como processo separado, é ele quem faz a ingestão, e as métricas dela saem
+no /metrics deste processo, na porta METRICS_PORT (padrão 9100).
+"""
+
+import datetime
+import os
+import threading
+import time
+import uuid
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core import models
+from core.database import SessionLocal, prune_article_changes
+from core.feed_discovery import prune_feed_discoveries
+from core.images import collect_orphan_images
+from core.metrics import start_metrics_server
+from core.retention import run_retention
+from journal import refresh_journals, seed_journal_from_feed
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+# Com 0 a API não inicia o scheduler; use quando ele rodar como processo próprio.
+SCHEDULER_IN_PROCESS = os.getenv("SCHEDULER_IN_PROCESS", "1") not in ("0", "false", "False")
+# De quanto em quanto tempo o scheduler procura journals vencidos quando está ocioso.
+SCHEDULER_POLL_SECONDS = float(os.getenv("SCHEDULER_POLL_SECONDS", "30"))
+# Quantos journals vencidos entram num mesmo refresh.
+SCHEDULER_BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", "16"))
+# Limites do intervalo adaptativo de cada journal, em segundos.
+REFRESH_MIN_INTERVAL = int(os.getenv("REFRESH_MIN_INTERVAL", "300"))
+REFRESH_DEFAULT_INTERVAL = int(os.getenv("REFRESH_DEFAULT_INTERVAL", "1800"))
+REFRESH_MAX_INTERVAL = int(os.getenv("REFRESH_MAX_INTERVAL", str(6 * 3600)))
+# Um job em 'running' (ou a reserva de um journal) sem renovação há mais
+# tempo que isso é de um processo que morreu.
+REFRESH_JOB_STALE_SECONDS = int(os.getenv("REFRESH_JOB_STALE_SECONDS", "900"))
+# De quanto em quanto tempo um refresh em andamento renova as reservas.
+REFRESH_LEASE_RENEW_SECONDS = float(os.getenv("REFRESH_LEASE_RENEW_SECONDS", str(REFRESH_JOB_STALE_SECONDS / 3)))
+# Jobs concluídos são apagados depois desse tempo.
+REFRESH_JOB_KEEP_HOURS = int(os.getenv("REFRESH_JOB_KEEP_HOURS", "24"))
+# Quantos dias o registro de mudanças (/api/articles/me/changes) guarda. Um
+# cliente parado há mais tempo que isso recarrega a lista inteira.
+ARTICLE_CHANGES_KEEP_DAYS = int(os.getenv("ARTICLE_CHANGES_KEEP_DAYS", "7"))
+SCHEDULER_HOUSEKEEPING_SECONDS = float(os.getenv("SCHEDULER_HOUSEKEEPING_SECONDS", "3600"))
+# A varredura de imagens órfãs percorre o diretório inteiro; roda com
+# intervalo próprio, mais longo que o da manutenção.
+IMAGE_GC_INTERVAL_SECONDS = float(os.getenv("IMAGE_GC_INTERVAL_SECONDS", str(24 * 3600)))
+
+ACTIVE_JOB_STATUSES = ("queued", "running")
+
+
+def next_refresh_interval(current: Optional[int], status: str, new_articles: int) -> int:
+    """
+    Intervalo até a próxima leitura do feed: cai pela metade quando o feed
+    trouxe artigos novos, cresce 50% quando não trouxe e dobra em caso de
+    erro, sempre dentro de [REFRESH_MIN_INTERVAL, REFRESH_MAX_INTERVAL].
+    """
+    interval = current or REFRESH_DEFAULT_INTERVAL
+
+    if status == "error":
+        interval *= 2
+    elif new_articles:
+        interval //= 2
+    else:
+        interval = int(interval * 1.5)
+
+    return max(REFRESH_MIN_INTERVAL, min(REFRESH_MAX_INTERVAL, interval))
+
+
+def reschedule_journals(db: Session, journal_timings: list[dict]):
+    """Grava a próxima leitura de cada journal a partir do resultado do refresh."""
+    now = datetime.datetime.now()
+
+    for timing in journal_timings:
+        journal = db.get(models.Journal, timing["journal_id"])
+        if journal is None:
+            continue
+
+        interval = next_refresh_interval(
+            journal.refresh_interval_seconds, timing["status"], timing["new_articles"]
+        )
+        journal.refresh_interval_seconds = interval
+        journal.next_refresh_at = now + datetime.timedelta(seconds=interval)
+        journal.refresh_leased_until = None
+        if timing["status"] != "error":
+            journal.last_refreshed_at = now
+
+    db.commit()
+
+
+def _not_leased(now: datetime.datetime):
+    return or_(models.Journal.refresh_leased_until.is_(None), models.Journal.refresh_leased_until <= now)
+
+
+def _lease_journals(db: Session, journal_ids: list[int], *conditions, now: datetime.datetime) -> list[models.Journal]:
+    """
+    Reserva os journals que ninguém reservou, com um UPDATE condicional:
+    dois processos (API e worker, ou um job e o scheduler) nunca pegam o
+    mesmo journal. LeaseHeartbeat a renova durante o refresh; se o processo
+    morrer, ela vence depois de REFRESH_JOB_STALE_SECONDS.
+    reschedule_journals a libera.
+    """
+    if not journal_ids:
+        return []
+
+    lease_until = now + datetime.timedelta(seconds=REFRESH_JOB_STALE_SECONDS)
+    db.execute(
+        update(models.Journal)
+        .where(models.Journal.id.in_(journal_ids), _not_leased(now), *conditions)
+        .values(refresh_leased_until=lease_until)
+    )
+    db.commit()
+
+    return db.scalars(
+        select(models.Journal).where(
+            models.Journal.id.in_(journal_ids),
+            models.Journal.refresh_leased_until == lease_until
+        )
+    ).all()
+
+
+class LeaseHeartbeat:
+    """
+    Renova, numa thread, as reservas dos journals e o heartbeat do job
+    enquanto o refresh roda; um refresh lento (esperas do limite por host)
+    não perde a reserva nem volta à fila no meio do caminho.
+    """
+
+    def __init__(self, journals: list[models.Journal], job_id: Optional[str] = None,
+                 interval: float = REFRESH_LEASE_RENEW_SECONDS):
+        self.journal_ids = [journal.id for journal in journals]
+        self.lease_until = journals[0].refresh_leased_until if journals else None
+        self.job_id = job_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if self.journal_ids or self.job_id:
+            self._thread = threading.Thread(target=self._run, name="lease-heartbeat", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.renew()
+            except Exception as e:
+                print(f"[scheduler] Falha ao renovar as reservas: {e}")
+
+    def renew(self):
+        now = datetime.datetime.now()
+        lease_until = now + datetime.timedelta(seconds=REFRESH_JOB_STALE_SECONDS)
+        with SessionLocal() as db:
+            if self.journal_ids and self.lease_until is not None:
+                # Só as reservas que ainda são desta execução.
+                db.execute(
+                    update(models.Journal)
+                    .where(
+                        models.Journal.id.in_(self.journal_ids),
+                        models.Journal.refresh_leased_until == self.lease_until
+                    )
+                    .values(refresh_leased_until=lease_until)
+                )
+            if self.job_id:
+                db.execute(
+                    update(models.RefreshJob)
+                    .where(models.RefreshJob.id == self.job_id, models.RefreshJob.status == "running")
+                    .values(heartbeat_at=now)
+                )
+            db.commit()
+        self.lease_until = lease_until
+
+
+def release_journals(db: Session, journal_ids: list[int]):
+    """Libera as reservas sem mexer na agenda (refresh que falhou no meio)."""
+    if journal_ids:
+        db.execute(
+            update(models.Journal)
+            .where(models.Journal.id.in_(journal_ids))
+            .values(refresh_leased_until=None)
+        )
+        db.commit()
+
+
+def claim_due_journals(db: Session, limit: int = SCHEDULER_BATCH_SIZE) -> list[models.Journal]:
+    """Reserva os journals vencidos que não estão sendo lidos por outro processo."""
+    now = datetime.datetime.now()
+    due = or_(models.Journal.next_refresh_at.is_(None), models.Journal.next_refresh_at <= now)
+
+    journal_ids = db.scalars(
+        select(models.Journal.id)
+        .where(due, _not_leased(now))
+        .order_by(models.Journal.next_refresh_at.is_not(None), models.Journal.next_refresh_at)
+        .limit(limit)
+    ).all()
+    return _lease_journals(db, journal_ids, due, now=now)
+
+
+def claim_user_journals(db: Session, user: models.User) -> list[models.Journal]:
+    """
+    Reserva os journals do usuário, vencidos ou não, menos os que outro
+    processo já está lendo: esses chegam atualizados pelo outro refresh.
+    """
+    journal_ids = [journal.id for journal in user.journals if journal.rss]
+    return _lease_journals(db, journal_ids, now=datetime.datetime.now())
+
+
+def enqueue_refresh(db: Session, user_id: int) -> models.RefreshJob:
+    """
+    Cria um job de atualização para o usuário e acorda o scheduler. Se já
+    houver um job dele na fila ou rodando, devolve esse mesmo job.
+    """
+    while True:
+        job = db.scalars(
+            select(models.RefreshJob)
+            .where(
+                models.RefreshJob.user_id == user_id,
+                models.RefreshJob.status.in_(ACTIVE_JOB_STATUSES)
+            )
+            .order_by(models.RefreshJob.created_at.desc())
+        ).first()
+        if job is not None:
+            break
+
+        job = models.RefreshJob(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            status="queued",
+            created_at=datetime.datetime.now()
+        )
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Outro pedido criou o job entre o SELECT e o INSERT
+            # (uq_refresh_jobs_active_user): devolve o dele.
+            db.rollback()
+            continue
+        db.refresh(job)
+        break
+
+    wake_scheduler()
+    return job
+
+
+def get_refresh_job(db: Session, user_id: int, job_id: str) -> Optional[models.RefreshJob]:
+    return db.scalars(
+        select(models.RefreshJob).where(
+            models.RefreshJob.id == job_id,
+            models.RefreshJob.user_id == user_id
+        )
+    ).first()
+
+
+def claim_next_job(db: Session) -> Optional[models.RefreshJob]:
+    job_id = db.scalars(
+        select(models.RefreshJob.id)
+        .where(models.RefreshJob.status == "queued")
+        .order_by(models.RefreshJob.created_at)
+        .limit(1)
+    ).first()
+    if job_id is None:
+        return None
+
+    claimed = db.execute(
+        update(models.RefreshJob)
+        .where(models.RefreshJob.id == job_id, models.RefreshJob.status == "queued")
+        .values(status="running", started_at=datetime.datetime.now(), heartbeat_at=datetime.datetime.now())
+    )
+    db.commit()
+
+    if claimed.rowcount != 1:
+        return None
+    return db.get(models.RefreshJob, job_id)
+
+
+def run_refresh_job(db: Session, job: models.RefreshJob):
+    """
+    Atualiza os journals do usuário do job, vencidos ou não, exceto os que
+    já estão sendo lidos pelo scheduler ou pelo job de outro usuário.
+    """
+    journal_ids = []
+    try:
+        user = db.get(models.User, job.user_id)
+        if user is None:
+            raise ValueError(f"Usuário {job.user_id} não existe mais.")
+
+        journals = claim_user_journals(db, user)
+        journal_ids = [journal.id for journal in journals]
+        with LeaseHeartbeat(journals, job.id):
+            refreshed = refresh_journals(db, journals)
+        result = {
+            "status": "success",
+            "user_id": user.id,
+            **refreshed,
+            "journals_in_progress": len([journal for journal in user.journals if journal.rss]) - len(journals),
+        }
+        reschedule_journals(db, result["journals"])
+        journal_ids = []
+
+        job.status = "done"
+        job.new_articles_found = result["new_articles_found"]
+        job.details = result
+    except Exception as e:
+        db.rollback()
+        print(f"  > [ERRO] Job de atualização {job.id} falhou: {e}")
+        release_journals(db, journal_ids)
+        job.status = "error"
+        job.error = str(e)
+
+    job.finished_at = datetime.datetime.now()
+    db.commit()
+
+
+def seed_new_journal(journal_id: int, feed):
+    """
+    Carga inicial de um journal recém-criado com o feed que a API já
+    validou; roda depois da resposta, como tarefa em segundo plano. A API
+    reserva o journal (refresh_leased_until) ao criá-lo, para o scheduler não
+    buscar o mesmo feed enquanto isto roda; no fim ele entra na agenda normal.
+    """
+    with SessionLocal() as db:
+        journal = db.get(models.Journal, journal_id)
+        if journal is None:
+            return
+
+        try:
+            with LeaseHeartbeat([journal]):
+                timing = seed_journal_from_feed(db, journal, feed)
+        except Exception as e:
+            db.rollback()
+            print(f"  > [ERRO] Falha na carga inicial do journal {journal_id}: {e}")
+            # Sem a carga inicial, o journal volta a vencer e o scheduler
+            # busca o feed do jeito normal.
+            journal.next_refresh_at = None
+            journal.refresh_leased_until = None
+            db.commit()
+            wake_scheduler()
+            return
+
+        reschedule_journals(db, [timing])
+
+
+def requeue_stale_jobs(db: Session):
+    """
+    Devolve à fila os jobs em 'running' cujo heartbeat parou (o processo
+    morreu) e apaga os antigos.
+    """
+    now = datetime.datetime.now()
+
+    db.execute(
+        update(models.RefreshJob)
+        .where(
+            models.RefreshJob.status == "running",
+            func.coalesce(models.RefreshJob.heartbeat_at, models.RefreshJob.started_at)
+            < now - datetime.timedelta(seconds=REFRESH_JOB_STALE_SECONDS)
+        )
+        .values(status="queued", started_at=None, heartbeat_at=None)
+    )
+    db.query(models.RefreshJob).filter(
+        models.RefreshJob.status.not_in(ACTIVE_JOB_STATUSES),
+        models.RefreshJob.finished_at < now - datetime.timedelta(hours=REFRESH_JOB_KEEP_HOURS)
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+class RefreshScheduler:
+    """
+    Laço de atualização em uma thread: primeiro os jobs pedidos pelos
+    usuários, depois os journals cujo next_refresh_at venceu. Quando não há
+    nada a fazer, dorme até o próximo ciclo ou até ser acordado por wake().
+    """
+
+    def __init__(self, poll_seconds: float = SCHEDULER_POLL_SECONDS, batch_size: int = SCHEDULER_BATCH_SIZE):
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_image_gc = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="refresh-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            # Um refresh em andamento pode demorar; a thread é daemon.
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def wake(self):
+        self._wake.set()
+
+    def run_pending(self) -> bool:
+        """Executa uma rodada de trabalho. Devolve False se não havia nada a fazer."""
+        with SessionLocal() as db:
+            job = claim_next_job(db)
+            if job is not None:
+                print(f"\n[scheduler] Executando job {job.id} do usuário {job.user_id}")
+                run_refresh_job(db, job)
+                return True
+
+            journals = claim_due_journals(db, self.batch_size)
+            if not journals:
+                return False
+
+            print(f"\n[scheduler] Atualizando {len(journals)} journals vencidos")
+            with LeaseHeartbeat(journals):
+                result = refresh_journals(db, journals)
+            reschedule_journals(db, result["journals"])
+            return True
+
+    def housekeeping(self):
+        with SessionLocal() as db:
+            requeue_stale_jobs(db)
+            # A retenção apaga em lotes com tempo limitado; o que sobrar
+            # fica para a próxima manutenção.
+            run_retention(db)
+            # A retenção só olha as imagens dos artigos que apagou; a
+            # varredura pega as que passaram disso (ainda no prazo de
+            # carência na hora, ou baixadas para artigos nunca salvos).
+            if self._last_image_gc is None or time.monotonic() - self._last_image_gc >= IMAGE_GC_INTERVAL_SECONDS:
+                self._last_image_gc = time.monotonic()
+                collect_orphan_images(db)
+            pruned = prune_article_changes(db, ARTICLE_CHANGES_KEEP_DAYS)
+            if pruned:
+                print(f"[scheduler] {pruned} registros de mudanças antigos removidos.")
+            pruned = prune_feed_discoveries(db)
+            if pruned:
+                print(f"[scheduler] {pruned} descobertas de feed vencidas removidas.")
+
+    def run_forever(self):
+        print("[scheduler] Iniciado.")
+        last_housekeeping = None
+
+        while not self._stop.is_set():
+            if last_housekeeping is None or time.monotonic() - last_housekeeping >= SCHEDULER_HOUSEKEEPING_SECONDS:
+                last_housekeeping = time.monotonic()
+                try:
+                    self.housekeeping()
+                except Exception as e:
+                    print(f"[scheduler] Falha na manutenção: {e}")
+
+            try:
+                worked = self.run_pending()
+            except Exception as e:
+                print(f"[scheduler] Erro inesperado: {e}")
+                worked = False
+
+            if not worked:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+        print("[scheduler] Parado.")
+
+
+_scheduler: Optional[RefreshScheduler] = None
+
+
+def start_background_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RefreshScheduler()
+        _scheduler.start()
+
+
+def stop_background_scheduler():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop()
+        _scheduler = None
+
+
+def wake_scheduler():
+    # Sem scheduler neste processo o worker separado pega o job no próximo ciclo.
+    if _scheduler is not None:
+        _scheduler.wake()
+
+
+if __name__ == "__main__":
+    models.setup_database_orm()
+    start_metrics_server()
+    try:
+        RefreshScheduler().run_forever()
+    except KeyboardInterrupt:
+        pass
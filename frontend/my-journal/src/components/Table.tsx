@@ -26,6 +26,7 @@ import {
 interface Article {
   id: string | number;
   image_url?: string | null;
+  thumbnail_url?: string | null;
   title: string;
   author?: string | null;
   topic?: string | null;
@@ -70,7 +71,8 @@ const ArticlesTable: React.FC<ArticlesTableProps> = ({ articles }) => {
           const article = row.original;
           return article.image_url ? (
             <img
-              src={article.image_url}
+              src={article.thumbnail_url ?? article.image_url}
+              loading="lazy"
               alt={article.title}
               className="w-24 h-16 object-cover rounded"
             />
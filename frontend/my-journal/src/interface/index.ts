@@ -8,9 +8,9 @@ export interface Article {
   summary: string | null; 
   author: string | null; 
   image_url: string | null; 
+  thumbnail_url: string | null;
   downloaded_at: string; 
   generic_news: boolean | null; 
-  user_id: number | null; 
   journal: Journal
 
   
@@ -31,6 +31,36 @@ export interface User {
 }
 
 
+export interface JournalStats {
+  id: number;
+  name: string;
+  rss: string;
+  url: string;
+  article_count: number;
+  unread_count: number;
+  latest_article_at: string | null;
+  last_refreshed_at: string | null;
+}
+
+// Resposta de /api/users/me: só agregados, sem a lista de artigos.
+export interface UserProfile {
+  id: number;
+  username: string;
+  email: string;
+  first_name: string | null; 
+  last_name: string | null; 
+  created_at: string; 
+  is_active: boolean;
+  is_admin: boolean;
+  newsletter_opt_in: boolean;
+  article_count: number;
+  unread_count: number;
+  journal_count: number;
+  last_refreshed_at: string | null;
+  journals: JournalStats[];
+}
+
+
 export interface Journal {
   id: number;
   name: string;
@@ -38,4 +68,11 @@ export interface Journal {
   url: string;
   users: User[];
   articles: Article[];
-}
\ No newline at end of file
+}
+export interface ArticleChanges {
+  cursor: number;
+  inserted: Article[];
+  deleted: number[];
+  reset: boolean;
+  has_more: boolean;
+}
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import { motion } from 'framer-motion';
 import {  Zap, Info, AlertTriangle, Newspaper, RefreshCw } from 'lucide-react';
 import Button from '../components/Button';
@@ -8,12 +8,15 @@ import ValidadeUrl from '../components/ValidateUrl';
 import Loader from '../components/Loading/Loading';
 import RefreshDialog, { type RefreshStatus } from '../components/RefreshDialog';
 import ArticlesTable from '../components/Table';
+import type { Article, ArticleChanges } from '../interface';
 
 
 const API_BASE_URL = '/api';
+const REFRESH_POLL_INTERVAL_MS = 1500;
+const CHANGES_POLL_INTERVAL_MS = 60000;
 
 const HomePage: React.FC = () => {
- const { articles, setArticles, hasLoaded, setHasLoaded } = useArticleStore();
+ const { articles, setArticles, hasLoaded, setHasLoaded, setChangeCursor, applyArticleChanges } = useArticleStore();
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [refreshResult, setRefreshResult] = useState<RefreshStatus | null>(null);
@@ -21,6 +24,57 @@ const HomePage: React.FC = () => {
   const [isDialogOpen, setIsDialogOpen] = useState(false);
   const token = useAuthStore((state) => state.token); 
 
+  const fetchWithAuth = useCallback(async (path: string) => {
+    const response = await fetch(`${API_BASE_URL}${path}`, {
+      headers: {
+        'Authorization': `Bearer ${token}`
+      }
+    });
+
+    if (response.status === 401) {
+      toast.error('Sessão expirada. Por favor, faça login novamente.');
+      throw new Error('Sessão expirada. Por favor, faça login novamente.');
+    }
+
+    if (!response.ok) {
+      throw new Error('Falha ao buscar os artigos.');
+    }
+
+    return response.json();
+  }, [token]);
+
+  // Carga completa: pega o cursor de mudanças antes da lista, para não
+  // perder nada que for inserido entre as duas chamadas.
+  const loadAllArticles = useCallback(async () => {
+    const changes: ArticleChanges = await fetchWithAuth('/articles/me/changes');
+    const data: Article[] = await fetchWithAuth('/articles/me');
+    setArticles(data);
+    setChangeCursor(changes.cursor);
+  }, [fetchWithAuth, setArticles, setChangeCursor]);
+
+  // Sincronização incremental: só o que mudou desde o último cursor.
+  const syncArticleChanges = useCallback(async () => {
+    let changes: ArticleChanges;
+    do {
+      const cursor = useArticleStore.getState().changeCursor;
+      if (cursor === null) {
+        await loadAllArticles();
+        return;
+      }
+
+      changes = await fetchWithAuth(`/articles/me/changes?since=${cursor}`);
+      if (changes.reset) {
+        await loadAllArticles();
+        return;
+      }
+
+      if (changes.inserted.length || changes.deleted.length) {
+        applyArticleChanges(changes.inserted, changes.deleted);
+      }
+      setChangeCursor(changes.cursor);
+    } while (changes.has_more);
+  }, [fetchWithAuth, loadAllArticles, applyArticleChanges, setChangeCursor]);
+
   useEffect(() => {
     const fetchArticles = async () => {
       try {
@@ -29,34 +83,14 @@ const HomePage: React.FC = () => {
           throw new Error('Usuário não autenticado. Por favor, faça login.');
         }
 
+        // Os feeds são atualizados em segundo plano pelo scheduler: aqui só
+        // lemos o banco, e só o delta quando a lista já foi carregada.
         if (hasLoaded) {
-        setIsLoading(false);
-        return;
-      }
-
-        const responseRefresh = await fetch(`${API_BASE_URL}/articles/me/refresh`, {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-            'Authorization': `Bearer ${token}`
-          }
-        });
-
-        if (responseRefresh.status === 401) {
-          toast.error('Sessão expirada. Por favor, faça login novamente.');
-          throw new Error('Sessão expirada. Por favor, faça login novamente.');
+          await syncArticleChanges();
+        } else {
+          await loadAllArticles();
+          setHasLoaded(true);
         }
-
-        if (!responseRefresh.ok) {
-            toast.error('Falha ao buscar os artigos atualizados.');
-          throw new Error('Falha ao buscar os artigos atualizados.');
-        }
-
-        const data = await responseRefresh.json();
-
-
-        setArticles(data.articles);
-        setHasLoaded(true);
       } catch (err: unknown) {
         let errorMessage = 'Ocorreu um erro inesperado.';
         if (err instanceof Error) {
@@ -70,7 +104,17 @@ const HomePage: React.FC = () => {
     };
 
     fetchArticles();
-  }, [token, hasLoaded, setArticles, setHasLoaded]); 
+  }, [token, hasLoaded, setHasLoaded, loadAllArticles, syncArticleChanges]); 
+
+  useEffect(() => {
+    if (!token || !hasLoaded) {
+      return;
+    }
+    const interval = setInterval(() => {
+      syncArticleChanges().catch(() => undefined);
+    }, CHANGES_POLL_INTERVAL_MS);
+    return () => clearInterval(interval);
+  }, [token, hasLoaded, syncArticleChanges]);
 
 
   const handleManualRefresh = async () => {
@@ -93,22 +137,40 @@ const HomePage: React.FC = () => {
         return; 
       }
 
-      const data = await responseRefresh.json();
+      let job = await responseRefresh.json();
 
       if (!responseRefresh.ok) {
-        throw new Error(data.message || 'Falha ao atualizar os artigos.');
+        throw new Error(job.detail || 'Falha ao atualizar os artigos.');
+      }
+
+      // O refresh roda em segundo plano: acompanha o job até ele terminar.
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, REFRESH_POLL_INTERVAL_MS));
+        const responseJob = await fetch(`${API_BASE_URL}/articles/me/refresh/${job.id}`, {
+          headers: {
+            'Authorization': `Bearer ${token}`
+          }
+        });
+        if (!responseJob.ok) {
+          throw new Error('Falha ao acompanhar a atualização dos artigos.');
+        }
+        job = await responseJob.json();
+      }
+
+      if (job.status === 'error') {
+        throw new Error(job.error || 'Falha ao atualizar os artigos.');
       }
 
-      setArticles(data.articles);    
+      await syncArticleChanges();
 
       const refreshData: RefreshStatus = {
-        message: data.message || 'Busca de novos artigos finalizada.',
-        new_articles_found: data.refresh_details.new_articles_found, 
-        total_articles: data.articles.length  
+        message: 'Busca de novos artigos finalizada.',
+        new_articles_found: job.new_articles_found ?? 0, 
+        total_articles: useArticleStore.getState().articles.length  
       }; 
       setRefreshResult(refreshData);        
       setIsDialogOpen(true);         
-      toast.success(data.message || 'Artigos atualizados!');
+      toast.success('Artigos atualizados!');
 
     } catch (err: unknown) {
       let errorMessage = 'Ocorreu um erro inesperado.';
@@ -12,12 +12,13 @@ import {
   Bell,
   AtSign,
   Newspaper,
+  MailOpen,
 } from 'lucide-react';
 import Button from '../components/Button';
 import { useAuthStore } from '../stores/store'; 
 import toast from 'react-hot-toast';
 import Loader from '../components/Loading/Loading';
-import type { User } from '../interface';
+import type { UserProfile } from '../interface';
 import InfoCard from '../components/InfoCard';
 
 
@@ -33,7 +34,7 @@ type UserFormData = {
 };
 
 const ProfilePage: React.FC = () => {
-  const [user, setUser] = useState<User | null>(null);
+  const [user, setUser] = useState<UserProfile | null>(null);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const token = useAuthStore((state) => state.token);
@@ -91,7 +92,7 @@ const ProfilePage: React.FC = () => {
         toast.error(errorData.detail || 'Falha ao atualizar o perfil.');
       }
 
-      const updatedUser: User = await response.json();
+      const updatedUser: UserProfile = await response.json();
 
 
       setUser(updatedUser);
@@ -137,7 +138,7 @@ const ProfilePage: React.FC = () => {
           throw new Error('Falha ao buscar dados do perfil.');
         }
 
-        const data: User = await response.json();
+        const data: UserProfile = await response.json();
         setUser(data);
       } catch (err: unknown) {
         let errorMessage = 'Ocorreu um erro inesperado.';
@@ -349,14 +350,46 @@ const ProfilePage: React.FC = () => {
           <StatCard
             icon={<BookMarked size={30} />}
             label="Artigos Salvos"
-            value={user.articles.length}
+            value={user.article_count}
           />
           <StatCard
             icon={<Newspaper size={30}/>}
             label="Journais Seguidos"
-            value={user.journals.length}
+            value={user.journal_count}
+          />
+          <StatCard
+            icon={<MailOpen size={30}/>}
+            label="Não Lidos"
+            value={user.unread_count}
           />
         </div>
+
+        {user.journals.length > 0 && (
+          <div className="mt-8 overflow-x-auto">
+            <table className="min-w-full text-left text-sm">
+              <thead className="border-b border-gray-200 text-gray-600">
+                <tr>
+                  <th className="py-2 pr-4">Journal</th>
+                  <th className="py-2 pr-4 text-right">Artigos</th>
+                  <th className="py-2 pr-4 text-right">Não lidos</th>
+                  <th className="py-2">Última atualização</th>
+                </tr>
+              </thead>
+              <tbody>
+                {user.journals.map((journal) => (
+                  <tr key={journal.id} className="border-b border-gray-100">
+                    <td className="py-2 pr-4 font-medium text-gray-900">{journal.name}</td>
+                    <td className="py-2 pr-4 text-right">{journal.article_count}</td>
+                    <td className="py-2 pr-4 text-right">{journal.unread_count}</td>
+                    <td className="py-2 text-gray-600">
+                      {journal.last_refreshed_at ? formatDate(journal.last_refreshed_at) : '—'}
+                    </td>
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          </div>
+        )}
       </div>
     </div>
   );
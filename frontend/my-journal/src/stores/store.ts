@@ -32,11 +32,25 @@ interface ArticleState {
   setArticles: (articles: Article[]) => void;
   hasLoaded: boolean; // Para saber se já fizemos o fetch inicial alguma vez
   setHasLoaded: (status: boolean) => void;
+  changeCursor: number | null; // Cursor de /articles/me/changes da última sincronização
+  setChangeCursor: (cursor: number | null) => void;
+  applyArticleChanges: (inserted: Article[], deleted: number[]) => void;
 }
 
+const byPublishedAtDesc = (a: Article, b: Article) =>
+  new Date(b.published_at).getTime() - new Date(a.published_at).getTime() || b.id - a.id;
+
 export const useArticleStore = create<ArticleState>((set) => ({
   articles: [],
   hasLoaded: false,
+  changeCursor: null,
   setArticles: (articles) => set({ articles }),
   setHasLoaded: (status) => set({ hasLoaded: status }),
+  setChangeCursor: (cursor) => set({ changeCursor: cursor }),
+  // Mescla o delta na lista local em vez de baixar todos os artigos de novo.
+  applyArticleChanges: (inserted, deleted) => set((state) => {
+    const removed = new Set([...deleted, ...inserted.map((article) => article.id)]);
+    const kept = state.articles.filter((article) => !removed.has(article.id));
+    return { articles: [...inserted, ...kept].sort(byPublishedAtDesc) };
+  }),
 }));
\ No newline at end of file